@@ -0,0 +1,74 @@
+"""
+Prompt size of /visual-disability/chat before and after retrieval.
+
+"Before" pastes the whole document and history into the prompt (the old
+behaviour); "after" sends the top-k BM25 sections and a bounded history
+window. Token counts are estimates from services.retrieval.estimate_tokens.
+
+Run from the backend folder:
+    python -m benchmarks.bench_chat_prompt_tokens
+"""
+import argparse
+import random
+
+from services.retrieval import (
+    BM25Index,
+    build_chat_prompt,
+    chunks_from_pages,
+    estimate_tokens,
+    format_sections,
+    window_history,
+)
+
+TOPICS = ["photosynthesis", "mitochondria", "osmosis", "enzymes", "respiration", "genetics", "ecosystems", "cells"]
+FILLER = "the process involves several stages that students should review carefully before the exam".split()
+
+
+def make_document(pages: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    document = []
+    for page_no in range(1, pages + 1):
+        content = [{"tag": "Title", "content": f"Chapter {page_no}"}]
+        for topic in rng.sample(TOPICS, 3):
+            content.append({"tag": "Section-header", "content": topic.title()})
+            for _ in range(3):
+                words = [rng.choice(FILLER) for _ in range(40)] + [topic]
+                content.append({"tag": "Text", "content": " ".join(words)})
+        content.append({"tag": "Picture", "content": f"out/visual/parsed_sections/page_{page_no}/Picture_0.png"})
+        document.append({"page": page_no, "content": content})
+    return document
+
+
+def make_history(turns: int) -> str:
+    return "\n".join(
+        f"user: question {i} about {TOPICS[i % len(TOPICS)]}\nassistant: {' '.join(FILLER)}"
+        for i in range(turns)
+    )
+
+
+def full_document_text(pages: list) -> str:
+    return "\n".join(item["content"] for page in pages for item in page["content"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    question = "How does osmosis work?"
+    print(f"{'pages':>5} | {'turns':>5} | {'before':>8} | {'after':>7} | {'saved':>6}")
+    for pages, turns in [(2, 2), (10, 5), (40, 10), (100, 30)]:
+        document = make_document(pages)
+        history = make_history(turns)
+
+        before = build_chat_prompt(full_document_text(document), history, question)
+        sections = BM25Index(chunks_from_pages(document)).search(question, top_k=args.top_k)
+        after = build_chat_prompt(format_sections(sections), window_history(history), question)
+
+        before_tokens, after_tokens = estimate_tokens(before), estimate_tokens(after)
+        saved = 1 - after_tokens / before_tokens
+        print(f"{pages:>5} | {turns:>5} | {before_tokens:>8} | {after_tokens:>7} | {saved:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
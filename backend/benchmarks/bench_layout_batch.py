@@ -0,0 +1,67 @@
+"""
+Pages/sec of YOLO layout detection on CPU for different batch sizes.
+
+Run from the backend folder:
+    python -m benchmarks.bench_layout_batch --pages 32
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from services.etl_service import ETLPipeline
+
+MODEL_PATH = "models/yolov12s-doclaynet.pt"
+BATCH_SIZES = [1, 4, 8, 16]
+
+
+def make_synthetic_page(seed: int, width: int = 2480, height: int = 3508) -> np.ndarray:
+    """A 300-DPI A4 page with a title, a few text blocks and a grey 'picture'."""
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.putText(page, f"Synthetic page {seed}", (200, 300), cv2.FONT_HERSHEY_SIMPLEX, 4, (0, 0, 0), 8)
+    y = 500
+    for block in range(6):
+        for line in range(int(rng.integers(3, 8))):
+            words = " ".join("lorem" for _ in range(int(rng.integers(6, 12))))
+            cv2.putText(page, words, (200, y), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (0, 0, 0), 3)
+            y += 70
+        y += 80
+        if block == 2:
+            cv2.rectangle(page, (400, y), (2000, y + 600), (120, 120, 120), -1)
+            y += 700
+    return page
+
+
+class _BenchPipeline(ETLPipeline):
+    """ETLPipeline without output folders or OCR pool, only the model (loaded up front)."""
+
+    def __init__(self, model_path: str):
+        self._model = YOLO(model_path)
+        self._model.to("cpu")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=32)
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    pipeline = _BenchPipeline(args.model)
+    pages = [make_synthetic_page(i) for i in range(args.pages)]
+
+    # Warm-up so the first timed batch does not pay for lazy initialisation
+    pipeline.detect_layouts(pages[:1])
+
+    print(f"{'batch':>5} | {'seconds':>8} | {'pages/sec':>9}")
+    for batch_size in BATCH_SIZES:
+        start = time.perf_counter()
+        pipeline.detect_layouts(pages, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size:>5} | {elapsed:>8.2f} | {args.pages / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
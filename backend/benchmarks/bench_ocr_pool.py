@@ -0,0 +1,71 @@
+"""
+Page-level OCR throughput: serial pytesseract calls vs the ETLPipeline OCR pool.
+
+Run from the backend folder:
+    python -m benchmarks.bench_ocr_pool --pages 8 --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+from benchmarks.bench_layout_batch import make_synthetic_page
+from services.etl_service import ETLPipeline, ocr_region
+
+
+def split_text_regions(page: np.ndarray, min_gap: int = 40) -> List[np.ndarray]:
+    """Cut a page into horizontal blocks of ink, standing in for YOLO text boxes."""
+    ink_rows = np.where((page < 128).any(axis=(1, 2)))[0]
+    if len(ink_rows) == 0:
+        return []
+    regions = []
+    block_start = prev = ink_rows[0]
+    for row in ink_rows[1:]:
+        if row - prev > min_gap:
+            regions.append(page[max(block_start - 10, 0):prev + 10])
+            block_start = row
+        prev = row
+    regions.append(page[max(block_start - 10, 0):prev + 10])
+    return regions
+
+
+class _BenchPipeline(ETLPipeline):
+    """ETLPipeline with only the OCR pool set up."""
+
+    def __init__(self, ocr_workers: int):
+        self.ocr_workers = ocr_workers
+        if ocr_workers > 1:
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        self.ocr_pool = ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="ocr")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pages = [split_text_regions(make_synthetic_page(i)) for i in range(args.pages)]
+    region_count = sum(len(regions) for regions in pages)
+    print(f"{args.pages} pages, {region_count} regions")
+
+    start = time.perf_counter()
+    serial_text = [[ocr_region(region) for region in regions] for regions in pages]
+    serial_elapsed = time.perf_counter() - start
+
+    pipeline = _BenchPipeline(args.workers)
+    start = time.perf_counter()
+    pooled_text = [pipeline.ocr_regions(regions) for regions in pages]
+    pooled_elapsed = time.perf_counter() - start
+
+    print(f"{'path':>12} | {'seconds':>8} | {'pages/sec':>9}")
+    print(f"{'serial':>12} | {serial_elapsed:>8.2f} | {args.pages / serial_elapsed:>9.2f}")
+    print(f"{f'pool x{args.workers}':>12} | {pooled_elapsed:>8.2f} | {args.pages / pooled_elapsed:>9.2f}")
+    print("Output identical:", serial_text == pooled_text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Office-to-PDF throughput: a cold ``libreoffice --convert-to`` per document
+vs the warm services.office_converter pool.
+
+Run from the backend folder (needs LibreOffice; the warm pool also needs
+its ``uno`` Python bridge, e.g. ``python3-uno`` on Debian/Ubuntu):
+    python -m benchmarks.bench_office_convert --docs 12 --workers 2
+"""
+import argparse
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from services.office_converter import OfficeConverterPool, cold_convert
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+
+def make_docx(path: str, paragraphs: int = 60) -> str:
+    """Minimal hand-built .docx with ``paragraphs`` lines of text."""
+    body = "".join(
+        f"<w:p><w:r><w:t>{escape(f'Paragraph {i}: the quick brown fox jumps over the lazy dog.')}</w:t></w:r></w:p>"
+        for i in range(paragraphs)
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    with zipfile.ZipFile(path, "w") as docx:
+        docx.writestr("[Content_Types].xml", CONTENT_TYPES)
+        docx.writestr("_rels/.rels", RELS)
+        docx.writestr("word/document.xml", document)
+    return path
+
+
+def run(convert, docs: list, out_dir: str, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda doc: convert(doc, out_dir), docs))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        docs = [make_docx(os.path.join(work_dir, f"doc_{i}.docx")) for i in range(args.docs)]
+        cold_out = os.path.join(work_dir, "cold")
+        warm_out = os.path.join(work_dir, "warm")
+        os.makedirs(cold_out)
+        os.makedirs(warm_out)
+
+        cold = run(cold_convert, docs, cold_out, args.workers)
+        print(f"cold spawn : {cold:6.2f}s  {args.docs / cold * 60:7.1f} conversions/min")
+
+        pool = OfficeConverterPool(args.workers, timeout=120)
+        if not pool.available:
+            print("warm pool  : skipped (the uno module is not importable from this Python)")
+            return
+        try:
+            pool.convert(docs[0], warm_out)  # start instances outside the timed run
+            warm = run(pool.convert, docs, warm_out, args.workers)
+        finally:
+            pool.shutdown()
+        print(f"warm pool  : {warm:6.2f}s  {args.docs / warm * 60:7.1f} conversions/min")
+        print(f"speedup    : {cold / warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
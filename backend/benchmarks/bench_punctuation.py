@@ -0,0 +1,112 @@
+"""
+End-to-end caption punctuation latency on three paths:
+
+    original  the pre-gateway serial loop, copied below: one chunk at a
+              time, 2 s sleep between chunks, 15/30/45 s sleeps on a 429
+    serial    today's ``deaf.punctuate_paragraph``: still one chunk at a
+              time, but through the LLM gateway (no fixed sleeps)
+    asyncio   ``deaf.punctuate_paragraphs_async``, what ``/captions`` uses
+
+Runs against the local fake LLM (benchmarks.fake_llm_server), so no Gemini
+key or network is needed:
+    python -m benchmarks.bench_punctuation --paragraphs 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import requests
+
+from benchmarks.fake_llm_server import fake_completion, serve
+
+PORT = 8766
+WORDS = "so today we are going to talk about how energy moves through an ecosystem and why it matters".split()
+
+
+def make_paragraphs(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    # ~1500 characters each, i.e. two punctuation chunks per paragraph
+    return [" ".join(rng.choice(WORDS) for _ in range(300)) for _ in range(count)]
+
+
+def original_punctuate_paragraph(deaf, paragraph: str) -> str:
+    """The serial loop ``/captions`` ran before the gateway, minus its prints."""
+    punctuated_parts = []
+    for i, chunk in enumerate(deaf.split_into_chunks(paragraph)):
+        if i > 0:
+            time.sleep(2.0)
+        success = False
+        for attempt in range(3):
+            try:
+                response = requests.post(
+                    f"http://127.0.0.1:{PORT}/generate",
+                    json={"model": deaf.GEMINI_MODEL, "prompt": deaf.punctuation_prompt(chunk)},
+                    timeout=60,
+                )
+                response.raise_for_status()
+                punctuated_parts.append(response.json()["text"].strip())
+                success = True
+                break
+            except Exception as e:
+                if "429" in str(e) or "quota" in str(e).lower():
+                    time.sleep(15 * (attempt + 1))
+                else:
+                    break
+        if not success:
+            punctuated_parts.append(chunk)
+    return " ".join(punctuated_parts)
+
+
+def expected_output(deaf, paragraphs: list) -> list:
+    """What the fake LLM returns for each paragraph, in input order."""
+    return [
+        " ".join(fake_completion(deaf.punctuation_prompt(chunk)).strip() for chunk in deaf.split_into_chunks(p))
+        for p in paragraphs
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM seconds per call")
+    parser.add_argument("--rpm", type=float, default=600, help="punctuation budget for the async path")
+    args = parser.parse_args()
+
+    server = serve(PORT, args.latency, rpm=0)
+    # Configure before deaf / llm_gateway are imported: they read env at import
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+    os.environ["LLM_RPM"] = "100000"
+    os.environ["LLM_BURST"] = "1000"
+    os.environ["PUNCTUATION_RPM"] = str(args.rpm)
+    import deaf
+
+    # Different text per run so the gateway's response cache cannot help any path
+    paths = {
+        "original": (lambda ps: [original_punctuate_paragraph(deaf, p) for p in ps], 1),
+        "serial": (lambda ps: [deaf.punctuate_paragraph(p) for p in ps], 2),
+        "asyncio": (lambda ps: asyncio.run(deaf.punctuate_paragraphs_async(ps))[0], 3),
+    }
+    results = {}
+    for name, (punctuate, seed) in paths.items():
+        paragraphs = make_paragraphs(args.paragraphs, seed=seed)
+        start = time.perf_counter()
+        output = punctuate(paragraphs)
+        elapsed = time.perf_counter() - start
+        # Every paragraph is distinct, so a position-wise match proves order
+        results[name] = (elapsed, output == expected_output(deaf, paragraphs))
+    chunk_count = sum(len(deaf.split_into_chunks(p)) for p in make_paragraphs(args.paragraphs, seed=1))
+
+    server.shutdown()
+    print(f"{args.paragraphs} paragraphs, {chunk_count} chunks, {args.latency}s per LLM call")
+    baseline = results["original"][0]
+    for name, (elapsed, in_order) in results.items():
+        print(
+            f"{name:>8}: {elapsed:7.2f}s  ({baseline / elapsed:.1f}x vs original)  "
+            f"every paragraph at its input position: {in_order}"
+        )
+
+
+if __name__ == "__main__":
+    main()
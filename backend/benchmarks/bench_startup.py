@@ -0,0 +1,83 @@
+"""
+App start-up cost: ``import main`` time, and process launch to the first
+successful ``GET /`` under uvicorn. With --warmup, also times
+``POST /visual-disability/warmup`` (model load plus one dummy inference).
+
+Run from the backend folder:
+    python -m benchmarks.bench_startup --runs 3 --warmup
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import() -> float:
+    """Seconds to ``import main`` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_first_response(warmup: bool, timeout: float = 120) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before serving")
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError("no response from / in time")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.05)
+        result = {"first_response": time.perf_counter() - start}
+
+        if warmup:
+            request = urllib.request.Request(f"http://127.0.0.1:{port}/visual-disability/warmup", method="POST")
+            warm_start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                result["warmup"] = time.perf_counter() - warm_start
+                result["warmup_timings"] = json.loads(response.read())["timings"]
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warmup", action="store_true", help="also time the warm-up endpoint")
+    args = parser.parse_args()
+
+    imports = [time_import() for _ in range(args.runs)]
+    print(f"import main          : median {statistics.median(imports):.2f}s  (runs: {', '.join(f'{t:.2f}' for t in imports)})")
+
+    runs = [time_first_response(args.warmup) for _ in range(args.runs)]
+    first = [run["first_response"] for run in runs]
+    print(f"launch -> first GET /: median {statistics.median(first):.2f}s  (runs: {', '.join(f'{t:.2f}' for t in first)})")
+    if args.warmup:
+        warm = [run["warmup"] for run in runs]
+        print(f"warm-up endpoint     : median {statistics.median(warm):.2f}s  last breakdown {runs[-1]['warmup_timings']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Single- vs two-resolution page processing on a synthetic PDF.
+
+"full" renders every page at --dpi and crops boxes out of it (the default
+pipeline). "adaptive" renders pages at --detect-dpi for YOLO and re-renders
+only the detected boxes at --dpi for OCR. Reports wall time, render time,
+page image memory and, as a quality check, how closely each page's OCR text
+in adaptive mode matches the full-resolution text (word-level similarity).
+
+Run from the backend folder (needs the model checkpoint):
+    python -m benchmarks.bench_two_resolution --pages 4 --detect-dpi 150
+"""
+import argparse
+import difflib
+import itertools
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import make_pdf
+from services.etl_service import ETLPipeline, open_pdf
+
+MODEL_PATH = "models/yolov12s-doclaynet.pt"
+
+
+def run(pipeline: ETLPipeline, pdf_path: str, dpi: int, region_dpi, out_dir: str) -> dict:
+    timings = {}
+    page_bytes = []
+
+    def pages(document):
+        for image, text_layer, renderer in pipeline.iter_pdf_pages(
+            pdf_path, dpi, timings=timings, region_dpi=region_dpi, document=document
+        ):
+            page_bytes.append(image.nbytes)
+            yield image, text_layer, renderer
+
+    output_dirs = (os.path.join(out_dir, f"page_{n}") for n in itertools.count(1))
+    start = time.perf_counter()
+    with open_pdf(pdf_path) as document:
+        parsed = list(pipeline.parse_page_images(pages(document), output_dirs, batch_size=4, timings=timings))
+    return {
+        "seconds": time.perf_counter() - start,
+        "timings": timings,
+        "page_mb": max(page_bytes) / 1e6 if page_bytes else 0.0,
+        "texts": [" ".join(item["content"] for item in page if item["tag"] not in ETLPipeline.VISUAL_LABELS) for page in parsed],
+    }
+
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--detect-dpi", type=int, default=150)
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pipeline = ETLPipeline(args.model, os.path.join(work_dir, "pages"), os.path.join(work_dir, "sections"))
+        pipeline.warmup()
+        pdf_path = make_pdf(os.path.join(work_dir, "doc.pdf"), pages=args.pages)
+
+        full = run(pipeline, pdf_path, args.dpi, None, os.path.join(work_dir, "full"))
+        adaptive = run(pipeline, pdf_path, args.detect_dpi, args.dpi, os.path.join(work_dir, "adaptive"))
+
+    print(f"{'mode':<9} | {'total s':>7} | {'render s':>8} | {'regions s':>9} | {'page MB':>7}")
+    for name, r in (("full", full), ("adaptive", adaptive)):
+        print(
+            f"{name:<9} | {r['seconds']:>7.2f} | {r['timings'].get('render', 0):>8.2f} | "
+            f"{r['timings'].get('region_render', 0):>9.2f} | {r['page_mb']:>7.1f}"
+        )
+    scores = [similarity(a, b) for a, b in zip(full["texts"], adaptive["texts"])]
+    print("OCR text similarity to full-DPI path per page:", ", ".join(f"{s:.3f}" for s in scores))
+    if scores:
+        print(f"mean similarity: {sum(scores) / len(scores):.3f}")
+
+
+if __name__ == "__main__":
+    main()
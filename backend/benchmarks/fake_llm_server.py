@@ -0,0 +1,105 @@
+"""
+Local stand-in for Gemini, speaking the protocol of llm_gateway.HTTPBackend.
+
+    python -m benchmarks.fake_llm_server --port 8765 --latency 0.5 --rpm 60
+    LLM_BASE_URL=http://127.0.0.1:8765 uvicorn main:app
+
+POST /generate {"model", "prompt"} -> {"text"}. Prompts containing a
+"Text:" block (the caption punctuation prompt) get that text back,
+capitalised and ending with a full stop. Anything else gets a short canned
+answer. When more than --rpm requests arrive within a minute the server
+answers 429, like the real quota.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_completion(prompt: str) -> str:
+    if "Text:" in prompt:
+        text = prompt.rsplit("Text:", 1)[1].strip()
+        return (text[:1].upper() + text[1:]).rstrip(".") + "."
+    return f"Stub answer for a {len(prompt)} character prompt."
+
+
+class FakeLLM:
+    def __init__(self, latency: float, rpm: int):
+        self.latency = latency
+        self.rpm = rpm
+        self.calls = deque()
+        self.lock = threading.Lock()
+        self.served = 0
+        self.throttled = 0
+
+    def admit(self) -> bool:
+        if self.rpm <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            while self.calls and now - self.calls[0] > 60:
+                self.calls.popleft()
+            if len(self.calls) >= self.rpm:
+                self.throttled += 1
+                return False
+            self.calls.append(now)
+            self.served += 1
+            return True
+
+
+def make_handler(llm: FakeLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/generate":
+                self._send(404, {"error": "not found"})
+                return
+            if not llm.admit():
+                self._send(429, {"error": "429 quota exceeded"})
+                return
+            time.sleep(llm.latency)
+            self._send(200, {"text": fake_completion(request.get("prompt", ""))})
+
+        def do_GET(self):
+            self._send(200, {"served": llm.served, "throttled": llm.throttled})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int, latency: float, rpm: int) -> ThreadingHTTPServer:
+    """Start the fake server on a background thread and return it (``shutdown()`` to stop)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FakeLLM(latency, rpm)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--rpm", type=int, default=0, help="0 disables throttling")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(FakeLLM(args.latency, args.rpm)))
+    print(f"Fake LLM listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Synthetic, deterministic inputs for the benchmark suite: multi-page PDFs,
+page images, YouTube-style caption JSON and transcripts. Nothing here
+touches the network.
+"""
+import random
+
+FILLER = (
+    "the cell membrane controls which molecules enter and leave while enzymes speed up "
+    "reactions that would otherwise take far too long for living things to survive"
+).split()
+
+
+def sentence(rng: random.Random, words: int = 14) -> str:
+    text = " ".join(rng.choice(FILLER) for _ in range(words))
+    return text[:1].upper() + text[1:] + "."
+
+
+def make_pdf(path: str, pages: int = 4, seed: int = 0) -> str:
+    """Born-digital A4 PDF with a title and a few text blocks per page (has a text layer)."""
+    import fitz
+
+    rng = random.Random(seed)
+    with fitz.open() as doc:
+        for page_no in range(1, pages + 1):
+            page = doc.new_page(width=595, height=842)
+            page.insert_text((72, 90), f"Chapter {page_no}", fontsize=24)
+            y = 140
+            for block in range(4):
+                page.insert_text((72, y), f"Section {page_no}.{block + 1}", fontsize=15)
+                y += 26
+                for _ in range(5):
+                    page.insert_text((72, y), sentence(rng, 11), fontsize=11)
+                    y += 17
+                y += 20
+        doc.save(path)
+    return path
+
+
+def make_page_image(path: str, seed: int = 0) -> str:
+    """300-DPI synthetic page image written to ``path`` (see bench_layout_batch)."""
+    import cv2
+
+    from benchmarks.bench_layout_batch import make_synthetic_page
+
+    cv2.imwrite(path, make_synthetic_page(seed))
+    return path
+
+
+def make_caption_json(minutes: int = 10, seed: int = 0) -> dict:
+    """
+    YouTube ``json3`` caption payload: ~2.5 s events, with a pause every
+    dozen captions so ``group_paragraphs`` has paragraphs to find.
+    """
+    rng = random.Random(seed)
+    events = [{"tStartMs": 0, "dDurationMs": minutes * 60_000, "id": 1, "wpWinPosId": 1}]  # window event, no segs
+    t = 0
+    count = 0
+    while t < minutes * 60_000:
+        duration = rng.randint(1800, 3200)
+        words = [rng.choice(FILLER) for _ in range(rng.randint(4, 9))]
+        events.append({
+            "tStartMs": t,
+            "dDurationMs": duration,
+            "segs": [{"utf8": word + " "} for word in words],
+        })
+        count += 1
+        t += duration + (1500 if count % 12 == 0 else 0)
+    return {"events": events}
+
+
+def make_transcript(minutes: int = 10, seed: int = 0) -> list:
+    """``YouTubeTranscriptApi.get_transcript`` shaped list."""
+    rng = random.Random(seed)
+    return [
+        {"text": sentence(rng, 8), "start": i * 3.0, "duration": 3.0}
+        for i in range(minutes * 20)
+    ]
+
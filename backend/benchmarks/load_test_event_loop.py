@@ -0,0 +1,94 @@
+"""
+Checks that light routes stay responsive while a large upload is processed.
+
+Starts the upload of a generated multi-page PDF, and while it runs keeps
+hitting ``/`` and ``/visual-disability/chat`` and records their latency.
+Needs a running backend:
+    uvicorn main:app --port 8000
+    python -m benchmarks.load_test_event_loop --pages 40
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import fitz
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+
+def make_pdf(pages: int) -> bytes:
+    with fitz.open() as doc:
+        for page_no in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Load test page {page_no + 1}", fontsize=24)
+            for line in range(30):
+                page.insert_text((72, 120 + line * 20), "The quick brown fox jumps over the lazy dog. " * 2, fontsize=10)
+        return doc.tobytes()
+
+
+def probe(path: str, method: str, latencies: list, stop: threading.Event, interval: float):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            if method == "GET":
+                requests.get(BASE_URL + path, timeout=60)
+            else:
+                requests.post(
+                    BASE_URL + path,
+                    json={"content": "A short document.", "history": "", "question": "What is it about?"},
+                    timeout=60
+                )
+        except requests.RequestException as e:
+            print(f"{path} failed: {e}")
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+
+
+def describe(name: str, latencies: list):
+    if not latencies:
+        print(f"{name:>24}: no samples")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1] if len(ordered) >= 20 else ordered[-1]
+    print(f"{name:>24}: n={len(ordered):<4} p50={statistics.median(ordered) * 1000:8.1f}ms "
+          f"p95={p95 * 1000:8.1f}ms max={ordered[-1] * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.1)
+    args = parser.parse_args()
+
+    pdf_bytes = make_pdf(args.pages)
+    stop = threading.Event()
+    root_latencies, chat_latencies = [], []
+    probes = [
+        threading.Thread(target=probe, args=("/", "GET", root_latencies, stop, args.interval)),
+        threading.Thread(target=probe, args=("/visual-disability/chat", "POST", chat_latencies, stop, args.interval)),
+    ]
+
+    for t in probes:
+        t.start()
+    # Unique bytes per run so the result cache cannot answer the upload
+    marker = str(time.time()).encode()
+    start = time.perf_counter()
+    response = requests.post(
+        BASE_URL + "/visual-disability/upload",
+        files={"file": ("load_test.pdf", pdf_bytes + b"\n%" + marker, "application/pdf")},
+        timeout=3600
+    )
+    upload_time = time.perf_counter() - start
+    stop.set()
+    for t in probes:
+        t.join()
+
+    print(f"Upload of {args.pages} pages: HTTP {response.status_code} in {upload_time:.1f}s")
+    describe("GET /", root_latencies)
+    describe("POST /chat", chat_latencies)
+
+
+if __name__ == "__main__":
+    main()
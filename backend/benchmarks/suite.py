@@ -0,0 +1,325 @@
+"""
+Offline benchmark suite for the backend.
+
+Every case runs against synthetic fixtures (benchmarks.fixtures), the local
+fake Gemini server (benchmarks.fake_llm_server) and YouTube stubs
+(benchmarks.youtube_stub), so results don't depend on the network or API
+quota. Outputs, caches and job state go to a throwaway work directory
+(OUT_DIR / DATA_DIR point there before any service module is imported).
+
+Run from the backend folder:
+    python -m benchmarks.suite                                  # all cases, table + JSON on stdout
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --save-baseline                  # write benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --tolerance 0.25
+    python -m benchmarks.suite --only captions --iterations 20
+
+With --baseline, any case whose median latency is more than --tolerance
+slower than the baseline is reported as a regression and the exit code is 1.
+Cases whose dependencies are missing (model checkpoint, pyttsx3, ...) are
+reported as skipped rather than failing the run.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from typing import Callable, Dict, List
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+MODEL_PATH = "models/yolov12s-doclaynet.pt"
+
+
+class SkipCase(Exception):
+    """Raised by a case whose prerequisites (model, engine, ...) are missing."""
+
+
+class Context:
+    def __init__(self, args, workdir: str):
+        self.args = args
+        self.workdir = workdir
+        # One loop for every async case, reused across iterations
+        self.loop = asyncio.new_event_loop()
+
+    def path(self, *parts: str) -> str:
+        """File path under the work directory (parent folders created)."""
+        path = os.path.join(self.workdir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def dir(self, *parts: str) -> str:
+        path = os.path.join(self.workdir, *parts)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+
+def configure_environment(args, workdir: str) -> None:
+    """Must run before any service module is imported: they read these at import time."""
+    # Every output / cache / job path is derived from these two roots
+    os.environ["OUT_DIR"] = os.path.join(workdir, "out")
+    os.environ["DATA_DIR"] = os.path.join(workdir, "data")
+    os.environ.pop("OFFICE_PROFILE_DIR", None)
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}"
+    # The fake server is local; don't let client-side budgets dominate the numbers
+    os.environ["LLM_RPM"] = "1000000"
+    os.environ["LLM_BURST"] = "1000"
+    os.environ["LLM_CACHE_SIZE"] = "0"
+    os.environ["PUNCTUATION_RPM"] = "1000000"
+    os.environ["PUNCTUATION_BURST"] = "1000"
+
+
+# ------------------------
+# Cases: each takes the context and returns ``run(iteration)``
+# ------------------------
+
+def _pipeline(ctx: Context):
+    from services.etl_service import ETLPipeline
+
+    return ETLPipeline(
+        model_path=MODEL_PATH,
+        page_image_dir=ctx.dir("pages"),
+        parsed_sections_dir=ctx.dir("sections"),
+    )
+
+
+def case_convert_document_to_images(ctx: Context):
+    from benchmarks.fixtures import make_pdf
+
+    pipeline = _pipeline(ctx)
+    pdf_path = make_pdf(ctx.path("fixtures", "doc.pdf"), pages=ctx.args.pages)
+    return lambda i: pipeline.convert_document_to_images(pdf_path, f"doc_{i}.pdf", dpi=ctx.args.dpi)
+
+
+def case_parse_image_layout(ctx: Context):
+    from benchmarks.fixtures import make_page_image
+
+    if not os.path.exists(MODEL_PATH):
+        raise SkipCase(f"model checkpoint {MODEL_PATH} not found")
+    pipeline = _pipeline(ctx)
+    pipeline.warmup()
+    image_path = make_page_image(ctx.path("fixtures", "page.png"))
+    return lambda i: pipeline.parse_image_layout(image_path, ctx.dir("sections", f"page_{i}"))
+
+
+def case_tts(ctx: Context):
+    try:
+        import pyttsx3  # noqa: F401
+    except ImportError:
+        raise SkipCase("pyttsx3 not installed")
+    from benchmarks.fixtures import sentence
+    from services.tts_utils import generate_tts_audio_segments, tts_pool
+    import random
+
+    tts_pool.warmup()
+    rng = random.Random(0)
+    pages = [" ".join(sentence(rng) for _ in range(4)) for _ in range(3)]
+    # New text every iteration, so each one synthesizes instead of hitting the segment cache
+    return lambda i: generate_tts_audio_segments([f"Run {i}. {page}" for page in pages], "wav")
+
+
+def case_chat(ctx: Context):
+    from benchmarks.bench_chat_prompt_tokens import make_document, make_history
+    from routers.visual_disability import chat_with_document
+
+    document = make_document(ctx.args.pages * 10)
+    history = make_history(10)
+    return lambda i: ctx.run(chat_with_document({
+        "pages": document,
+        "history": history,
+        "question": f"How does osmosis work? ({i})",
+    }))
+
+
+def case_caption_grouping(ctx: Context):
+    from benchmarks.fixtures import make_caption_json
+    from deaf import clean_caption_events, group_paragraphs
+
+    events = make_caption_json(minutes=ctx.args.video_minutes)["events"]
+    return lambda i: group_paragraphs(clean_caption_events(events))
+
+
+def case_caption_punctuation(ctx: Context):
+    from benchmarks.fixtures import make_caption_json
+    from deaf import clean_caption_events, group_paragraphs, punctuate_paragraphs_async
+
+    events = make_caption_json(minutes=ctx.args.video_minutes)["events"]
+    paragraphs = [p["text"] for p in group_paragraphs(clean_caption_events(events))]
+    return lambda i: ctx.run(punctuate_paragraphs_async([f"{i} {p}" for p in paragraphs]))
+
+
+def case_captions_endpoint(ctx: Context):
+    from benchmarks import youtube_stub
+    from benchmarks.fixtures import make_caption_json, make_transcript
+    from deaf import get_captions
+
+    youtube_stub.install(make_caption_json(minutes=ctx.args.video_minutes), make_transcript())
+    # A new video id per iteration: measures the uncached path
+    return lambda i: ctx.run(get_captions(f"https://youtu.be/bc{i:09d}"))
+
+
+def case_analyze_structure(ctx: Context):
+    from benchmarks import youtube_stub
+    from benchmarks.fixtures import make_caption_json, make_transcript
+    from routers.learning_disability import AnalyzeReq, analyze_structure
+
+    youtube_stub.install(make_caption_json(), make_transcript(minutes=ctx.args.video_minutes))
+    return lambda i: ctx.run(analyze_structure(AnalyzeReq(url=f"https://youtu.be/as{i:09d}")))
+
+
+CASES: Dict[str, Callable] = {
+    "etl.convert_document_to_images": case_convert_document_to_images,
+    "etl.parse_image_layout": case_parse_image_layout,
+    "tts.generate_segments": case_tts,
+    "chat.answer": case_chat,
+    "captions.grouping": case_caption_grouping,
+    "captions.punctuation": case_caption_punctuation,
+    "captions.endpoint": case_captions_endpoint,
+    "learning.analyze_structure": case_analyze_structure,
+}
+
+
+# ------------------------
+# Measurement & reporting
+# ------------------------
+
+def summarize(latencies: List[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "iterations": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        # Nearest rank: with few iterations this is the maximum, never below p50
+        "p95_ms": round(ordered[math.ceil(len(ordered) * 0.95) - 1] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "throughput_per_s": round(len(ordered) / sum(ordered), 3) if sum(ordered) else None,
+    }
+
+
+def run_case(name: str, setup: Callable, ctx: Context) -> dict:
+    try:
+        run = setup(ctx)
+        for i in range(ctx.args.warmup):
+            run(-1 - i)
+        latencies = []
+        for i in range(ctx.args.iterations):
+            start = time.perf_counter()
+            run(i)
+            latencies.append(time.perf_counter() - start)
+        return {"status": "ok", **summarize(latencies)}
+    except SkipCase as e:
+        return {"status": "skipped", "reason": str(e)}
+    except ImportError as e:
+        return {"status": "skipped", "reason": f"missing dependency: {e}"}
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[dict]:
+    rows = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if current.get("status") != "ok" or not before or before.get("status") != "ok":
+            continue
+        ratio = current["p50_ms"] / before["p50_ms"] if before["p50_ms"] else 1.0
+        rows.append({
+            "case": name,
+            "baseline_p50_ms": before["p50_ms"],
+            "p50_ms": current["p50_ms"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def print_table(results: dict) -> None:
+    print(f"{'case':<32} | {'status':<7} | {'p50 ms':>9} | {'p95 ms':>9} | {'ops/s':>8}", file=sys.stderr)
+    for name, r in results.items():
+        if r["status"] == "ok":
+            print(f"{name:<32} | {'ok':<7} | {r['p50_ms']:>9.1f} | {r['p95_ms']:>9.1f} | {r['throughput_per_s'] or 0:>8.2f}", file=sys.stderr)
+        else:
+            print(f"{name:<32} | {r['status']:<7} | {r['reason']}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", default="", help="run cases whose name starts with this prefix")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=4, help="pages per synthetic document")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--video-minutes", type=int, default=10)
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake Gemini latency per call (s)")
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this results/baseline JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write results to {BASELINE_PATH}")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    configure_environment(args, workdir)
+    from benchmarks.fake_llm_server import serve
+
+    server = serve(args.llm_port, args.llm_latency, rpm=0)
+    ctx = Context(args, workdir)
+    try:
+        results = {
+            name: run_case(name, setup, ctx)
+            for name, setup in CASES.items()
+            if name.startswith(args.only)
+        }
+    finally:
+        server.shutdown()
+        ctx.loop.close()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")},
+        },
+        "results": results,
+    }
+    print_table(results)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        report["comparison"] = rows
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"{row['case']:<32} {row['baseline_p50_ms']:>9.1f} -> {row['p50_ms']:>9.1f} ms  x{row['ratio']:<6} {flag}", file=sys.stderr)
+        if any(row["regression"] for row in rows):
+            exit_code = 1
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            f.write(payload)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Offline stand-ins for the YouTube side of deaf.py and the learning router:
+yt-dlp metadata, the caption JSON download and the transcript API. The
+Gemini side is covered by benchmarks.fake_llm_server.
+"""
+from types import SimpleNamespace
+
+CAPTION_URL = "stub://captions/json3"
+
+
+class FakeYoutubeDL:
+    """Just enough of ``yt_dlp.YoutubeDL`` for ``load_captions`` / ``fetch_video_text``."""
+
+    def __init__(self, opts=None):
+        self.opts = opts or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=False):
+        return {
+            "automatic_captions": {"en": [{"ext": "json3", "url": CAPTION_URL}]},
+            "subtitles": {},
+            "description": "",
+        }
+
+
+class FakeResponse:
+    def __init__(self, payload: dict):
+        self.payload = payload
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self.payload
+
+
+def install(captions_json: dict, transcript: list) -> None:
+    """Point deaf.py and routers.learning_disability at the stubs (call after importing them)."""
+    import deaf
+    from routers import learning_disability
+
+    fake_yt_dlp = SimpleNamespace(YoutubeDL=FakeYoutubeDL)
+    deaf.yt_dlp = fake_yt_dlp
+    deaf.requests = SimpleNamespace(get=lambda url, timeout=None: FakeResponse(captions_json))
+
+    learning_disability.yt_dlp = fake_yt_dlp
+    learning_disability.YouTubeTranscriptApi = SimpleNamespace(get_transcript=lambda video_id: transcript)
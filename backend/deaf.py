@@ -1,10 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import yt_dlp
 import requests
+import asyncio
+import hashlib
+import json
 import os
 import sys
+import time
 from urllib.parse import unquote
 from dotenv import load_dotenv
 load_dotenv()
@@ -12,18 +16,15 @@ load_dotenv()
 # =========================
 # NEW: Optional Gemini setup
 # =========================
-try:
-    import google.generativeai as genai
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel("gemini-2.0-flash")
-    else:
-        gemini_model = None
-except Exception:
-    gemini_model = None
+# Shared client with rate limiting, 429 retries and response caching
+from services.executor import run_in_stage
+from services.llm_gateway import LLM_BURST, LLM_RPM, TokenBucket, llm_gateway
+from services.caption_index import CaptionIndex, CaptionIndexCache
+from services.media_cache import extract_video_id, get_media, put_media
+
+GEMINI_MODEL = "gemini-2.0-flash"
 
-print("Gemini active:", gemini_model is not None, flush=True)
+print("Gemini active:", llm_gateway.available, flush=True)
 
 
 app = FastAPI()
@@ -40,26 +41,26 @@ app.add_middleware(
 # =========================
 # NEW: punctuation helper
 # =========================
-import time
 
-def punctuate_paragraph(paragraph: str) -> str:
-    """
-    Uses Gemini to add punctuation & capitalization.
-    Splits long paragraphs into chunks to avoid token limits/timeouts.
-    Adds delays to respect rate limits.
-    """
-    if not gemini_model:
-        return paragraph
+MAX_CHUNK_SIZE = 1000  # characters roughly
+# Punctuation gets a share of the gateway's global LLM_RPM, so one long
+# video can't take the whole budget from chat / summaries meanwhile
+PUNCTUATION_SHARE = float(os.getenv("PUNCTUATION_SHARE", "0.5"))
+PUNCTUATION_RPM = float(os.getenv("PUNCTUATION_RPM", str(LLM_RPM * PUNCTUATION_SHARE)))
+PUNCTUATION_BURST = int(os.getenv("PUNCTUATION_BURST", str(max(1, int(LLM_BURST * PUNCTUATION_SHARE)))))
+
+punctuation_limiter = TokenBucket(PUNCTUATION_RPM, PUNCTUATION_BURST)
+
 
-    # 1. Chunking settings
-    MAX_CHUNK_SIZE = 1000  # characters roughly
+def split_into_chunks(paragraph: str) -> list:
+    """Split long paragraphs into chunks to avoid token limits/timeouts."""
     chunks = []
-    
+
     # Simple chunking by space to avoid cutting words
     words = paragraph.split(' ')
     current_chunk = []
     current_length = 0
-    
+
     for word in words:
         if current_length + len(word) + 1 > MAX_CHUNK_SIZE and current_chunk:
             chunks.append(" ".join(current_chunk))
@@ -67,22 +68,15 @@ def punctuate_paragraph(paragraph: str) -> str:
             current_length = 0
         current_chunk.append(word)
         current_length += len(word) + 1
-        
+
     if current_chunk:
         chunks.append(" ".join(current_chunk))
 
-    print(f"[punctuate_paragraph] Split into {len(chunks)} chunks.", flush=True)
+    return chunks
 
-    punctuated_parts = []
-    
-    for i, chunk in enumerate(chunks):
-        # Rate limit delay: Google Free Tier is often ~15 RPM (1 req / 4 sec) or similar.
-        # Let's be safe with 2 seconds, but rely on retries for 429s.
-        if i > 0:
-            print("[punctuate_paragraph] Sleeping 2s...", flush=True)
-            time.sleep(2.0)
 
-        prompt = f"""
+def punctuation_prompt(chunk: str) -> str:
+    return f"""
 You are a text editor.
 
 Task:
@@ -102,44 +96,290 @@ PUNCT: "This became the fundamental conclusion of the theory of relativity, a th
 Text:
 {chunk}
 """
-        # Retry loop
-        max_retries = 3
-        success = False
-        
-        for attempt in range(max_retries):
-            try:
-                print(f"[punctuate_paragraph] Chunk {i+1}/{len(chunks)} Attempt {attempt+1}...", flush=True)
-                response = gemini_model.generate_content(prompt)
-                result = response.text.strip()
-                punctuated_parts.append(result)
-                success = True
-                break
-            except Exception as e:
-                # check if it is a quota error (429)
-                error_str = str(e)
-                if "429" in error_str or "quota" in error_str.lower():
-                    wait_time = 15 * (attempt + 1) # 15s, 30s, 45s
-                    print(f"[punctuate_paragraph] 429 Quota Exceeded. Sleeping {wait_time}s...", flush=True)
-                    time.sleep(wait_time)
-                else:
-                    print(f"[punctuate_paragraph] Valid error: {e}", flush=True)
-                    # Non-retriable error? Maybe just break. 
-                    # But for safety let's just break and fallback.
-                    break
-        
-        if not success:
-            print(f"[punctuate_paragraph] Failed to punctuate chunk {i+1} after retries. Using raw.", flush=True)
+
+
+def punctuate_paragraph(paragraph: str) -> str:
+    """
+    Uses Gemini to add punctuation & capitalization, one chunk at a time.
+    Rate limiting and 429 retries are handled by the LLM gateway.
+    Serial path; ``/captions`` uses ``punctuate_paragraphs_async``.
+    """
+    if not llm_gateway.available:
+        return paragraph
+
+    chunks = split_into_chunks(paragraph)
+    print(f"[punctuate_paragraph] Split into {len(chunks)} chunks.", flush=True)
+
+    punctuated_parts = []
+
+    for i, chunk in enumerate(chunks):
+        try:
+            print(f"[punctuate_paragraph] Chunk {i+1}/{len(chunks)}...", flush=True)
+            result = llm_gateway.generate(punctuation_prompt(chunk), model=GEMINI_MODEL)
+            punctuated_parts.append(result.strip())
+        except Exception as e:
+            print(f"[punctuate_paragraph] Failed to punctuate chunk {i+1}: {e}. Using raw.", flush=True)
             punctuated_parts.append(chunk)
 
     return " ".join(punctuated_parts)
 
 
+async def punctuate_chunk_async(chunk: str) -> tuple:
+    """
+    Punctuate one chunk within the punctuation budget. Returns
+    ``(text, ok)``; on failure ``text`` is the raw chunk and ``ok`` is False.
+    """
+    await punctuation_limiter.acquire_async()
+    try:
+        result = await llm_gateway.agenerate(punctuation_prompt(chunk), model=GEMINI_MODEL)
+        return result.strip(), True
+    except Exception as e:
+        print(f"[punctuate] Failed to punctuate chunk: {e}. Using raw.", flush=True)
+        return chunk, False
+
+
+async def punctuate_paragraph_async(paragraph: str) -> tuple:
+    """``(text, ok)``: ``ok`` only when Gemini punctuated every chunk."""
+    if not llm_gateway.available:
+        return paragraph, False
+    results = await asyncio.gather(*(punctuate_chunk_async(chunk) for chunk in split_into_chunks(paragraph)))
+    return " ".join(text for text, _ in results), all(ok for _, ok in results)
+
+
+async def punctuate_paragraphs_async(paragraphs: list) -> tuple:
+    """
+    Punctuate all chunks of all paragraphs concurrently, under
+    ``PUNCTUATION_RPM``, and reassemble them in their original order.
+    Returns ``(paragraphs, ok)``; only cache the result when ``ok``.
+    """
+    results = await asyncio.gather(*(punctuate_paragraph_async(p) for p in paragraphs))
+    return [text for text, _ in results], all(ok for _, ok in results)
+
+
+# =========================
+# Caption fetching & grouping
+# =========================
+
+PARAGRAPH_PAUSE = 0.6
+MAX_PARA_LENGTH = 1000
+
+
+def clean_caption_events(events: list) -> list:
+    """Extract caption text + timing"""
+    captions_clean = []
+    for event in events:
+        if not event.get("segs"):
+            continue
+
+        text = "".join(seg.get("utf8", "") for seg in event["segs"]).strip()
+        if not text:
+            continue
+
+        captions_clean.append({
+            "start": event.get("tStartMs", 0) / 1000.0,
+            "duration": event.get("dDurationMs", 0) / 1000.0,
+            "text": text
+        })
+    return captions_clean
+
+
+def group_paragraphs(captions_clean: list) -> list:
+    """
+    Group captions into paragraphs on pauses longer than ``PARAGRAPH_PAUSE``
+    or once a paragraph passes ``MAX_PARA_LENGTH`` characters. Returns
+    ``{"text", "start", "end"}`` per paragraph.
+    """
+    paragraphs = []
+    current_para = ""
+    para_start = para_end = 0.0
+
+    for i, cap in enumerate(captions_clean):
+        split_now = False
+
+        # 1. Split by time gap
+        if i > 0:
+            prev = captions_clean[i - 1]
+            gap = cap["start"] - (prev["start"] + prev["duration"])
+            if gap > PARAGRAPH_PAUSE:
+                split_now = True
+
+        # 2. Split by length (force split if too long)
+        if len(current_para) > MAX_PARA_LENGTH:
+            split_now = True
+
+        if split_now:
+            if current_para.strip():
+                paragraphs.append({"text": current_para.strip(), "start": para_start, "end": para_end})
+            current_para = ""
+
+        if not current_para:
+            para_start = cap["start"]
+        current_para += " " + cap["text"]
+        para_end = cap["start"] + cap["duration"]
+
+    if current_para.strip():
+        paragraphs.append({"text": current_para.strip(), "start": para_start, "end": para_end})
+
+    return paragraphs
+
+
+def caption_error(message: str) -> dict:
+    return {
+        "error": message,
+        "events": [],
+        "paragraphs": []
+    }
+
+
+def load_captions(url: str) -> dict:
+    """
+    Fetch English captions from YouTube using yt-dlp and group them into
+    paragraphs. Blocking; returns ``{"events", "paragraphs"}`` where each
+    paragraph is ``{"text", "start", "end"}``, or a ``caption_error``.
+    """
+    ydl_opts = {
+        "skip_download": True,
+        "writesubtitles": True,
+        "writeautomaticsub": True,
+        "subtitleslangs": ["en", "en-US", "en-GB"],
+        "quiet": True,
+        "no_warnings": True,
+    }
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    # Try automatic captions first, then manual subtitles
+    captions = info.get("automatic_captions") or {}
+    if not captions:
+        captions = info.get("subtitles") or {}
+
+    # Try different English language codes
+    caption_data = None
+    for lang_code in ["en", "en-US", "en-GB", "en-CA", "en-AU"]:
+        if lang_code in captions and captions[lang_code]:
+            caption_list = captions[lang_code]
+            for caption_option in caption_list:
+                if caption_option.get("ext") in ("json3", "json"):
+                    caption_data = caption_option
+                    break
+            if caption_data:
+                break
+
+    if not caption_data:
+        return caption_error("No English captions available for this video.")
+
+    # Fetch caption JSON
+    response = requests.get(caption_data["url"], timeout=10)
+    response.raise_for_status()
+    caption_json = response.json()
+
+    events = caption_json.get("events") or caption_json.get("body") or []
+    if not events:
+        return caption_error("Could not parse caption format from YouTube.")
+
+    captions_clean = clean_caption_events(events)
+    if not captions_clean:
+        return caption_error("No usable caption text found.")
+
+    return {
+        "events": events,
+        "paragraphs": group_paragraphs(captions_clean)
+    }
+
+
+CAPTION_LANG = "en"
+PUNCTUATED_KIND = f"punctuated-{GEMINI_MODEL}"
+
+
+def load_captions_cached(url: str) -> dict:
+    """``load_captions`` backed by the shared media cache (by video id + language)."""
+    video_id = extract_video_id(url)
+    cached = get_media("captions", video_id, CAPTION_LANG)
+    if cached is not None:
+        print(f"⚡ Captions cache hit: {video_id}", flush=True)
+        return cached
+    captions = load_captions(url)
+    if "error" in captions:
+        return captions
+    return put_media("captions", video_id, captions, CAPTION_LANG)
+
+
+def paragraphs_digest(raw_paragraphs: list) -> str:
+    return hashlib.sha256(json.dumps(raw_paragraphs).encode("utf-8")).hexdigest()
+
+
+def get_punctuated(video_id: str, raw_paragraphs: list):
+    """
+    Cached punctuated texts for ``raw_paragraphs``, or None. Captions and
+    punctuation are evicted independently, and a re-fetch can group
+    paragraphs differently, so an entry only counts when it was made from
+    exactly these raw texts.
+    """
+    cached = get_media(PUNCTUATED_KIND, video_id, CAPTION_LANG)
+    if cached is None or cached.get("source") != paragraphs_digest(raw_paragraphs):
+        return None
+    return cached["paragraphs"]
+
+
+def put_punctuated(video_id: str, raw_paragraphs: list, punctuated: list) -> None:
+    payload = {"source": paragraphs_digest(raw_paragraphs), "paragraphs": punctuated}
+    put_media(PUNCTUATED_KIND, video_id, payload, CAPTION_LANG)
+
+
+# =========================
+# Time-indexed caption lookups
+# =========================
+
+CAPTION_WINDOW_BEFORE = 5.0    # seconds of context behind the playhead
+CAPTION_WINDOW_AFTER = 30.0
+CAPTION_WINDOW_MAX = 600.0
+
+caption_indexes = CaptionIndexCache()
+
+
+def load_caption_index(url: str):
+    """
+    ``CaptionIndex`` for a video, built once and kept in memory. Prefers
+    punctuated paragraph text when it has been cached. Blocking; returns a
+    ``caption_error`` dict when captions can't be loaded.
+    """
+    video_id = extract_video_id(url) or url
+    punctuated_key, raw_key = f"{video_id}:punctuated", f"{video_id}:raw"
+    index = caption_indexes.get(punctuated_key)
+    if index is not None:
+        return index
+
+    captions = load_captions_cached(url)
+    if "error" in captions:
+        return captions
+    punctuated = get_punctuated(extract_video_id(url), [p["text"] for p in captions["paragraphs"]])
+
+    def build() -> CaptionIndex:
+        paragraphs = captions["paragraphs"]
+        if punctuated is not None:
+            paragraphs = [{**para, "text": text} for para, text in zip(paragraphs, punctuated)]
+        return CaptionIndex(clean_caption_events(captions["events"]), paragraphs)
+
+    return caption_indexes.get_or_build(punctuated_key if punctuated is not None else raw_key, build)
+
+
+def _log_error() -> None:
+    import traceback
+    error_trace = traceback.format_exc()
+    print("=" * 50, flush=True)
+    print("ERROR CAUGHT:", flush=True)
+    print(error_trace, flush=True)
+    print("=" * 50, flush=True)
+
+
 @app.get("/captions")
-def get_captions(url: str):
+async def get_captions(url: str, events: bool = True):
     """
     Fetch English captions from YouTube using yt-dlp.
     Tries automatic captions first, then manual subtitles.
-    Returns raw events JSON.
+    Returns raw events JSON (skip it with ``events=false`` and use
+    ``/captions/window`` for playback sync instead).
     """
     print("=" * 50, flush=True)
     print("ENDPOINT CALLED - /captions", flush=True)
@@ -149,136 +389,160 @@ def get_captions(url: str):
     print(f"URL received (decoded): {url}", flush=True)
     print("=" * 50, flush=True)
     try:
-        ydl_opts = {
-            "skip_download": True,
-            "writesubtitles": True,
-            "writeautomaticsub": True,
-            "subtitleslangs": ["en", "en-US", "en-GB"],
-            "quiet": True,
-            "no_warnings": True,
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-
-        # Try automatic captions first, then manual subtitles
-        captions = info.get("automatic_captions") or {}
-        if not captions:
-            captions = info.get("subtitles") or {}
-
-        # Try different English language codes
-        caption_data = None
-        for lang_code in ["en", "en-US", "en-GB", "en-CA", "en-AU"]:
-            if lang_code in captions and captions[lang_code]:
-                caption_list = captions[lang_code]
-                for caption_option in caption_list:
-                    if caption_option.get("ext") in ("json3", "json"):
-                        caption_data = caption_option
-                        break
-                if caption_data:
-                    break
-
-        if not caption_data:
-            return {
-                "error": "No English captions available for this video.",
-                "events": [],
-                "paragraphs": []
-            }
-
-        # Fetch caption JSON
-        response = requests.get(caption_data["url"], timeout=10)
-        response.raise_for_status()
-        caption_json = response.json()
-
-        events = caption_json.get("events") or caption_json.get("body") or []
-        if not events:
-            return {
-                "error": "Could not parse caption format from YouTube.",
-                "events": [],
-                "paragraphs": []
-            }
-
-        # Extract caption text + timing
-        captions_clean = []
-        for event in events:
-            if not event.get("segs"):
-                continue
-
-            text = "".join(seg.get("utf8", "") for seg in event["segs"]).strip()
-            if not text:
-                continue
-
-            captions_clean.append({
-                "start": event.get("tStartMs", 0) / 1000.0,
-                "duration": event.get("dDurationMs", 0) / 1000.0,
-                "text": text
-            })
-
-        if not captions_clean:
-            return {
-                "error": "No usable caption text found.",
-                "events": [],
-                "paragraphs": []
-            }
-
-        # Paragraph grouping
-        PARAGRAPH_PAUSE = 0.6
-        MAX_PARA_LENGTH = 1000
-        raw_paragraphs = []
-        current_para = ""
-
-        for i, cap in enumerate(captions_clean):
-            split_now = False
-            
-            # 1. Split by time gap
-            if i > 0:
-                prev = captions_clean[i - 1]
-                gap = cap["start"] - (prev["start"] + prev["duration"])
-                if gap > PARAGRAPH_PAUSE:
-                    split_now = True
-
-            # 2. Split by length (force split if too long)
-            if len(current_para) > MAX_PARA_LENGTH:
-                split_now = True
-
-            if split_now:
-                if current_para.strip():
-                    raw_paragraphs.append(current_para.strip())
-                current_para = ""
-
-            current_para += " " + cap["text"]
-
-        if current_para.strip():
-            raw_paragraphs.append(current_para.strip())
+        video_id = extract_video_id(url)
+        captions = await run_in_stage("io", load_captions_cached, url)
+        if "error" in captions:
+            return captions
 
+        raw_paragraphs = [p["text"] for p in captions["paragraphs"]]
         print("RAW PARAGRAPHS:", raw_paragraphs, flush=True)
 
         # =========================
         # NEW: punctuate paragraphs
         # =========================
-        punctuated_paragraphs = []
-        for para in raw_paragraphs:
-            punctuated = punctuate_paragraph(para)
-            print("RAW:", para, flush=True)
-            print("PUNCT:", punctuated, flush=True)
-            print("-" * 40, flush=True)
-            punctuated_paragraphs.append(punctuated)
+        punctuated_paragraphs = await run_in_stage("io", get_punctuated, video_id, raw_paragraphs)
+        if punctuated_paragraphs is None:
+            punctuated_paragraphs, complete = await punctuate_paragraphs_async(raw_paragraphs)
+            # Raw fallbacks (429s, timeouts) must not be cached as punctuated
+            if complete:
+                await run_in_stage("io", put_punctuated, video_id, raw_paragraphs, punctuated_paragraphs)
 
         return {
-            "events": events,
+            "events": captions["events"] if events else [],
             "paragraphs": punctuated_paragraphs,   # frontend uses this
             "paragraphs_raw": raw_paragraphs        # optional debug
         }
 
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print("=" * 50, flush=True)
-        print("ERROR CAUGHT:", flush=True)
-        print(error_trace, flush=True)
-        print("=" * 50, flush=True)
-        return {
-            "error": f"Error processing video: {str(e)}",
-            "events": [],
-            "paragraphs": []
-        }
+        _log_error()
+        return caption_error(f"Error processing video: {str(e)}")
+
+
+@app.get("/captions/stream")
+async def stream_captions(url: str):
+    """
+    Streaming variant of ``/captions`` (NDJSON). Sends every raw timed
+    paragraph straight away, then a ``punctuated`` event per paragraph as
+    soon as its punctuation completes, in completion order:
+
+        {"event": "paragraph",  "index", "start", "end", "text"}   (raw)
+        {"event": "punctuated", "index", "start", "end", "text"}
+        {"event": "done", "paragraphs", "elapsed"}
+    """
+    url = unquote(url)
+    print(f"ENDPOINT CALLED - /captions/stream: {url}", flush=True)
+
+    async def events():
+        start_time = time.time()
+        video_id = extract_video_id(url)
+        try:
+            captions = await run_in_stage("io", load_captions_cached, url)
+        except Exception as e:
+            _log_error()
+            captions = caption_error(f"Error processing video: {str(e)}")
+        if "error" in captions:
+            yield json.dumps({"event": "error", "error": captions["error"]}) + "\n"
+            return
+
+        paragraphs = captions["paragraphs"]
+        for index, para in enumerate(paragraphs):
+            yield json.dumps({"event": "paragraph", "index": index, **para}) + "\n"
+
+        raw_paragraphs = [p["text"] for p in paragraphs]
+        cached = await run_in_stage("io", get_punctuated, video_id, raw_paragraphs)
+        punctuated = list(cached) if cached is not None else [None] * len(paragraphs)
+        failed = []
+
+        async def punctuate(index: int, para: dict):
+            if punctuated[index] is None:
+                punctuated[index], ok = await punctuate_paragraph_async(para["text"])
+                if not ok:
+                    failed.append(index)
+            return index, punctuated[index]
+
+        tasks = [asyncio.create_task(punctuate(i, p)) for i, p in enumerate(paragraphs)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                index, text = await finished
+                para = paragraphs[index]
+                yield json.dumps({
+                    "event": "punctuated",
+                    "index": index,
+                    "start": para["start"],
+                    "end": para["end"],
+                    "text": text
+                }) + "\n"
+        finally:
+            # Client went away: stop spending LLM budget on it
+            for task in tasks:
+                task.cancel()
+
+        # Raw fallbacks (429s, timeouts) must not be cached as punctuated
+        if cached is None and not failed:
+            await run_in_stage("io", put_punctuated, video_id, raw_paragraphs, punctuated)
+
+        yield json.dumps({
+            "event": "done",
+            "paragraphs": len(paragraphs),
+            "elapsed": round(time.time() - start_time, 2)
+        }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/captions/window")
+async def get_caption_window(
+    url: str,
+    t: float,
+    before: float = CAPTION_WINDOW_BEFORE,
+    after: float = CAPTION_WINDOW_AFTER
+):
+    """
+    Captions and paragraphs overlapping ``[t - before, t + after)`` plus the
+    caption and paragraph active at ``t``. The player polls this as the
+    playhead moves instead of downloading every event up front.
+    """
+    url = unquote(url)
+    before = min(max(before, 0.0), CAPTION_WINDOW_MAX)
+    after = min(max(after, 0.0), CAPTION_WINDOW_MAX)
+    try:
+        index = await run_in_stage("io", load_caption_index, url)
+    except Exception as e:
+        _log_error()
+        return caption_error(f"Error processing video: {str(e)}")
+    if isinstance(index, dict):
+        return index
+
+    active = index.active(t)
+    active_paragraph = index.active_paragraph(t)
+    return {
+        "t": t,
+        "start": max(t - before, 0.0),
+        "end": t + after,
+        "duration": index.duration,
+        "active": active,
+        "active_paragraph": active_paragraph,
+        "captions": index.window(t - before, t + after),
+        "paragraphs": index.paragraph_window(t - before, t + after)
+    }
+
+
+@app.get("/captions/active")
+async def get_active_caption(url: str, t: float):
+    """The caption and paragraph on screen at ``t`` (``null`` in a gap)."""
+    url = unquote(url)
+    try:
+        index = await run_in_stage("io", load_caption_index, url)
+    except Exception as e:
+        _log_error()
+        return caption_error(f"Error processing video: {str(e)}")
+    if isinstance(index, dict):
+        return index
+
+    active = index.active(t)
+    active_paragraph = index.active_paragraph(t)
+    return {
+        "t": t,
+        "caption": index.caption(active) if active is not None else None,
+        "paragraph": index.paragraph(active_paragraph) if active_paragraph is not None else None
+    }
@@ -1,8 +1,24 @@
+import logging
+import os
+import threading
+
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from routers.files import router as FilesRouter
 from routers.learning_disability import router as LearningRouter
-from routers.visual_disability import router as VisualRouter
+from routers.visual_disability import router as VisualRouter, job_manager, page_cache, result_cache, warmup_models
+from services.llm_gateway import llm_gateway
+from services.metrics import CONTENT_TYPE, registry
+from services.office_converter import office_pool
+from services.storage import output_store
+from services.tts_utils import tts_pool
+
+# LOG_LEVEL=DEBUG shows per-page / per-box pipeline messages; WARNING silences progress logs
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 app = FastAPI(
     title="ImagineCup backend",
@@ -18,8 +34,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 🔊 Serve audio / images
-app.mount("/out", StaticFiles(directory="out"), name="out")
+# 🔊 Serve audio / images (ETag + Range; access times feed output GC)
+app.include_router(
+    FilesRouter,
+    prefix="/out",
+    tags=["Files"]
+)
 
 app.include_router(
     LearningRouter,
@@ -33,6 +53,46 @@ app.include_router(
     tags=["Visual Disability"]
 )
 
+# Models load on first use; set WARMUP_ON_STARTUP=1 to preload them in the
+# background right after startup (the app serves requests meanwhile).
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+
+@app.on_event("startup")
+def start_warmup():
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=warmup_models, name="warmup", daemon=True).start()
+
+
+@app.on_event("startup")
+def start_background_workers():
+    output_store.start()
+    # Not at import: resumes orphaned jobs, which only the serving app should do
+    job_manager.start()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    job_manager.stop()
+    output_store.stop()
+    # Don't leave headless soffice processes behind
+    office_pool.shutdown()
+
+
+registry.register_gauges("tts_pool", "TTS worker pool state.", tts_pool.metrics)
+registry.register_gauges("office_pool", "LibreOffice converter pool state.", office_pool.metrics)
+registry.register_gauges("llm_gateway", "LLM gateway request counters.", lambda: llm_gateway.stats)
+registry.register_gauges("result_cache", "Document result cache counters.", result_cache.stats)
+registry.register_gauges("page_cache", "Per-page result cache counters.", page_cache.stats)
+registry.register_gauges("output_store", "Generated output storage and GC.", output_store.metrics)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of pipeline stage histograms and pool/cache state."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 def root():
     return {"message": "Backend running successfully 🚀"}
@@ -0,0 +1,95 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+import mimetypes
+import os
+from email.utils import formatdate
+from typing import Optional
+
+from services.storage import OUT_DIR, output_store
+
+router = APIRouter()
+
+CHUNK_SIZE = 256 * 1024
+# Job outputs live in per-upload namespaces and tracks are named by content
+# hash, so a URL's bytes don't change while it exists
+CACHE_CONTROL = "public, max-age=86400"
+
+
+def _resolve(path: str) -> str:
+    root = os.path.realpath(OUT_DIR)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if not full_path.startswith(root + os.sep) or not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="Not found")
+    return full_path
+
+
+def _parse_range(header: str, size: int) -> Optional[tuple]:
+    """``(start, end)`` inclusive for a single ``bytes=`` range; ``None`` to serve the whole file."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = min(int(end_s), size - 1) if end_s else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(end_s), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"])
+def serve_output(path: str, request: Request):
+    """
+    Generated files (page images, crops, audio) with ETag / Last-Modified
+    revalidation and single-range requests, so players can seek in audio.
+    """
+    full_path = _resolve(path)
+    st = os.stat(full_path)
+    # Access is recorded beside the file, so its mtime (and the ETag) stay put
+    output_store.touch(full_path)
+
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = _parse_range(range_header, st.st_size)
+
+    if byte_range is None:
+        start, length, status = 0, st.st_size, 200
+    else:
+        start, end = byte_range
+        length, status = end - start + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status, headers=headers, media_type=media_type)
+    return StreamingResponse(_iter_file(full_path, start, length), status_code=status, headers=headers, media_type=media_type)
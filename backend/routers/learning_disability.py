@@ -1,11 +1,18 @@
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from youtube_transcript_api import YouTubeTranscriptApi
 import yt_dlp
+import asyncio
+import hashlib
+import json
 import re
 import os
-import google.generativeai as genai
+import time
 from dotenv import load_dotenv
+from services.executor import run_in_stage
+from services.llm_gateway import llm_gateway
+from services.media_cache import extract_video_id, get_media, put_media
 
 # Load env variables
 load_dotenv()
@@ -13,31 +20,66 @@ load_dotenv()
 router = APIRouter()
 
 # -------- Gemini Model Setup --------
-api_key = os.getenv("GEMINI_API_KEY")
-
-if api_key:
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-2.5-flash-lite")
-else:
-    print("❗ WARNING: GEMINI_API_KEY missing in .env")
-    model = None
+# Client, rate limiting, retries and caching live in services.llm_gateway
+MODEL_NAME = "gemini-2.5-flash-lite"
 
 
 # -------- Helper Functions --------
 
-def extract_video_id(url: str):
-    regex = r"(?:youtu\.be\/|v\/|u\/\w\/|embed\/|watch\?v=|&v=)([^#&?]*).*"
-    match = re.search(regex, url)
-    if match and len(match.group(1)) == 11:
-        return match.group(1)
-    return None
-
-
 def parse_timestamps(text: str):
     regex = r"(\d{1,2}:\d{2}(?::\d{2})?)\s+([^\n]+)"
     return re.findall(regex, text)
 
 
+def build_flashcards(full_text: str) -> list:
+    """Flashcard titles from the description's chapter timestamps, or generic ones."""
+    timestamps = parse_timestamps(full_text)
+    if timestamps:
+        return [{"title": t[1], "timestamp": t[0]} for t in timestamps]
+    if len(full_text) > 100:
+        return [
+            {"title": "Core Topic", "timestamp": "00:00"},
+            {"title": "Deep Dive", "timestamp": "01:30"},
+            {"title": "Key Takeaways", "timestamp": "03:00"},
+        ]
+    return []
+
+
+def summary_prompt(full_text: str) -> str:
+    return (
+        f"Summarize this video in 3 concise sentences. "
+        f"Context: {full_text[:3000]}"
+    )
+
+
+def card_prompt(title: str, context: str) -> str:
+    return f"""
+    You are an expert tutor creating detailed study notes.
+    Task: Explain the concept "{title}" using the video context.
+    
+    Video Context: {context[:1000]}...
+
+    Output Format (raw HTML only):
+    <div>
+      <h3 class='text-xl font-bold text-indigo-900 mb-2'>Core Concept</h3>
+      <p class='text-gray-700 leading-relaxed mb-4'>[Simple definition]</p>
+      
+      <div class='bg-indigo-50 p-4 rounded-xl border border-indigo-100 mb-4'>
+         <h4 class='font-bold text-indigo-800 text-sm mb-1'>💡 Key Insight</h4>
+         <p class='text-indigo-900 text-sm'>[One crucial takeaway]</p>
+      </div>
+
+      <h4 class='font-bold text-gray-500 uppercase text-xs tracking-wider mb-1'>Why it Matters</h4>
+      <p class='text-gray-600'>[Practical application]</p>
+    </div>
+    """
+
+
+def card_kind(title: str) -> str:
+    """Media cache kind for one generated card (titles can be long or contain anything)."""
+    return f"card-{MODEL_NAME}-{hashlib.sha1(title.encode('utf-8')).hexdigest()[:16]}"
+
+
 # -------- Pydantic Models --------
 
 class AnalyzeReq(BaseModel):
@@ -54,6 +96,71 @@ class DoubtReq(BaseModel):
     context: str
 
 
+def fetch_video_text(video_id: str, url: str) -> str:
+    """
+    Transcript text, falling back to the video description (blocking
+    network calls). Only real transcripts are cached: a fallback may come
+    from a transient transcript-API error.
+    """
+    cached = get_media("transcript", video_id)
+    if cached is not None:
+        return cached["text"]
+    text, is_transcript = _fetch_video_text(video_id, url)
+    if is_transcript and text:
+        put_media("transcript", video_id, {"text": text})
+    return text
+
+
+def _fetch_video_text(video_id: str, url: str) -> tuple:
+    """``(text, is_transcript)``."""
+    try:
+        transcript = YouTubeTranscriptApi.get_transcript(video_id)
+        return " ".join([t["text"] for t in transcript]), True
+    except:
+        try:
+            ydl_opts = {"quiet": True, "skip_download": True}
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+                return info.get("description", ""), False
+        except:
+            return "No content found.", False
+
+
+async def generate_text(prompt: str) -> str:
+    return await llm_gateway.agenerate(prompt, model=MODEL_NAME)
+
+
+async def video_summary(video_id: str, full_text: str) -> str:
+    """Three-sentence summary, cached per video."""
+    if not llm_gateway.available:
+        return "Summary loading..."
+    kind = f"summary-{MODEL_NAME}"
+    cached = await run_in_stage("io", get_media, kind, video_id)
+    if cached is not None:
+        return cached["text"]
+    try:
+        summary = await generate_text(summary_prompt(full_text))
+    except Exception as e:
+        print(f"Summary Error: {e}")
+        return "Summary unavailable (Rate Limit)."
+    await run_in_stage("io", put_media, kind, video_id, {"text": summary})
+    return summary
+
+
+async def video_card(video_id: str, title: str, context: str) -> dict:
+    """``/generate_card`` output for one title, cached per video and title."""
+    cached = await run_in_stage("io", get_media, card_kind(title), video_id)
+    if cached is not None:
+        return cached
+    try:
+        text = await generate_text(card_prompt(title, context))
+    except Exception as e:
+        return {"error": str(e)}
+    card = {"content": text.replace("```html", "").replace("```", "")}
+    await run_in_stage("io", put_media, card_kind(title), video_id, card)
+    return card
+
+
 # -------- ROUTES --------
 
 @router.post("/analyze_structure")
@@ -67,47 +174,13 @@ async def analyze_structure(body: AnalyzeReq):
     print(f"Analyzing Structure for video: {video_id}")
 
     # ---- 1. Fetch Transcript or Description ----
-    full_text = ""
-    try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        full_text = " ".join([t["text"] for t in transcript])
-    except:
-        try:
-            ydl_opts = {"quiet": True, "skip_download": True}
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                full_text = info.get("description", "")
-        except:
-            full_text = "No content found."
+    full_text = await run_in_stage("io", fetch_video_text, video_id, url)
 
     # ---- 2. Extract Timestamps ----
-    timestamps = parse_timestamps(full_text)
-    flashcards = []
-
-    if not timestamps:
-        if len(full_text) > 100:
-            flashcards = [
-                {"title": "Core Topic", "timestamp": "00:00"},
-                {"title": "Deep Dive", "timestamp": "01:30"},
-                {"title": "Key Takeaways", "timestamp": "03:00"},
-            ]
-    else:
-        for t in timestamps:
-            flashcards.append({"title": t[1], "timestamp": t[0]})
+    flashcards = build_flashcards(full_text)
 
     # ---- 3. Generate Summary ----
-    summary = "Summary loading..."
-    if model:
-        try:
-            prompt = (
-                f"Summarize this video in 3 concise sentences. "
-                f"Context: {full_text[:3000]}"
-            )
-            response = model.generate_content(prompt)
-            summary = response.text
-        except Exception as e:
-            print(f"Summary Error: {e}")
-            summary = "Summary unavailable (Rate Limit)."
+    summary = await video_summary(video_id, full_text)
 
     return {
         "summary": summary,
@@ -118,36 +191,12 @@ async def analyze_structure(body: AnalyzeReq):
 
 @router.post("/generate_card")
 async def generate_card(body: CardReq):
-    if not model:
+    if not llm_gateway.available:
         return {"content": "<p>No API Key</p>"}
 
-    title = body.title
-    context = body.context
-
-    prompt = f"""
-    You are an expert tutor creating detailed study notes.
-    Task: Explain the concept "{title}" using the video context.
-    
-    Video Context: {context[:1000]}...
-
-    Output Format (raw HTML only):
-    <div>
-      <h3 class='text-xl font-bold text-indigo-900 mb-2'>Core Concept</h3>
-      <p class='text-gray-700 leading-relaxed mb-4'>[Simple definition]</p>
-      
-      <div class='bg-indigo-50 p-4 rounded-xl border border-indigo-100 mb-4'>
-         <h4 class='font-bold text-indigo-800 text-sm mb-1'>💡 Key Insight</h4>
-         <p class='text-indigo-900 text-sm'>[One crucial takeaway]</p>
-      </div>
-
-      <h4 class='font-bold text-gray-500 uppercase text-xs tracking-wider mb-1'>Why it Matters</h4>
-      <p class='text-gray-600'>[Practical application]</p>
-    </div>
-    """
-
     try:
-        response = model.generate_content(prompt)
-        text = response.text.replace("```html", "").replace("```", "")
+        text = await generate_text(card_prompt(body.title, body.context))
+        text = text.replace("```html", "").replace("```", "")
         return {"content": text}
     except Exception as e:
         return {"error": str(e)}
@@ -155,7 +204,7 @@ async def generate_card(body: CardReq):
 
 @router.post("/solve_doubt")
 async def solve_doubt(body: DoubtReq):
-    if not model:
+    if not llm_gateway.available:
         return {"answer": "API Key Missing"}
 
     prompt = f"""
@@ -168,7 +217,83 @@ async def solve_doubt(body: DoubtReq):
     """
 
     try:
-        response = model.generate_content(prompt)
-        return {"answer": response.text}
+        return {"answer": await generate_text(prompt)}
     except Exception as e:
         return {"answer": f"Thinking failed: {str(e)}"}
+
+
+async def _study_pack(video_id: str, url: str):
+    """
+    Yields ``(kind, payload)`` for everything the study page needs: the
+    flashcard titles first, then the summary and each card as soon as its
+    LLM call (all started together) finishes.
+    """
+    full_text = await run_in_stage("io", fetch_video_text, video_id, url)
+    flashcards = build_flashcards(full_text)
+    yield "structure", {"flashcards": flashcards, "raw_clean": full_text[:5000]}
+
+    async def summary():
+        return "summary", None, await video_summary(video_id, full_text)
+
+    async def card(index: int, title: str):
+        if not llm_gateway.available:
+            return "card", index, {"content": "<p>No API Key</p>"}
+        # Same context the UI sends to /generate_card, so cached prompts line up
+        return "card", index, await video_card(video_id, title, full_text[:5000])
+
+    tasks = [asyncio.create_task(summary())]
+    tasks += [asyncio.create_task(card(i, c["title"])) for i, c in enumerate(flashcards)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            kind, index, payload = await finished
+            if kind == "summary":
+                yield "summary", {"summary": payload}
+            else:
+                yield "card", {"index": index, **flashcards[index], **payload}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/study_pack")
+async def study_pack(body: AnalyzeReq):
+    """``analyze_structure`` plus every flashcard's content, generated concurrently."""
+    video_id = extract_video_id(body.url)
+    if not video_id:
+        return {"error": "Invalid YouTube URL"}
+
+    start_time = time.time()
+    result = {}
+    cards = []
+    async for kind, payload in _study_pack(video_id, body.url):
+        if kind == "card":
+            cards.append(payload)
+        else:
+            result.update(payload)
+    for card in cards:
+        result["flashcards"][card["index"]] = card
+    result["processing_time"] = round(time.time() - start_time, 2)
+    return result
+
+
+@router.post("/study_pack/stream")
+async def study_pack_stream(body: AnalyzeReq):
+    """
+    Streaming variant of ``/study_pack`` (NDJSON):
+
+        {"event": "structure", "flashcards", "raw_clean"}
+        {"event": "summary", "summary"}
+        {"event": "card", "index", "title", "timestamp", "content" | "error"}   (completion order)
+        {"event": "done", "processing_time"}
+    """
+    video_id = extract_video_id(body.url)
+    if not video_id:
+        return {"error": "Invalid YouTube URL"}
+
+    async def events():
+        start_time = time.time()
+        async for kind, payload in _study_pack(video_id, body.url):
+            yield json.dumps({"event": kind, **payload}) + "\n"
+        yield json.dumps({"event": "done", "processing_time": round(time.time() - start_time, 2)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
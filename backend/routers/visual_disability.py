@@ -1,134 +1,496 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+import hashlib
+import itertools
+import json
+import logging
 import os
-import shutil
+import re
 import tempfile
 import time
+from contextlib import ExitStack
+from typing import Optional
 
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from services.tts_utils import generate_tts_audio
+from services.tts_utils import AUDIO_FORMATS, TTSQueueFull, generate_tts_audio_segments, stream_tts_audio, tts_pool
 from services.etl_service import normalize_for_speech
-from services.etl_service import ETLPipeline
+from services.etl_service import ETLPipeline, open_pdf
+from services.result_cache import PageCache, ResultCache, checkpoint_fingerprint, export_crops, make_result_key
+from services.executor import iterate_in_stage, run_in_stage
+from services.llm_gateway import llm_gateway
+from services.metrics import DOCUMENTS, PAGES, span
+from services.office_converter import office_pool
+from services.storage import DATA_DIR, VISUAL_OUT_DIR, output_store
+from services.jobs import JobManager
+from services.retrieval import (
+    BM25Index,
+    IndexCache,
+    build_chat_prompt,
+    chunks_from_text,
+    estimate_tokens,
+    format_sections,
+    window_history,
+)
 
 # ------------------------
 # Config
 # ------------------------
 
-PAGE_IMAGE_DIR = "out/visual/converted_images"
-PARSED_SECTIONS_DIR = "out/visual/parsed_sections"
+PAGE_IMAGE_DIR = os.path.join(VISUAL_OUT_DIR, "converted_images")
+PARSED_SECTIONS_DIR = os.path.join(VISUAL_OUT_DIR, "parsed_sections")
 MODEL_PATH = "models/yolov12s-doclaynet.pt"
+RENDER_DPI = 300
+# Two-resolution mode: detect layouts on pages rendered at DETECT_DPI and
+# re-render only the detected boxes at RENDER_DPI for OCR / crops. 0 keeps
+# rendering whole pages at RENDER_DPI.
+DETECT_DPI = int(os.getenv("DETECT_DPI", "0"))
+LAYOUT_BATCH_SIZE = int(os.getenv("LAYOUT_BATCH_SIZE", "8"))
+RENDER_PREFETCH = int(os.getenv("RENDER_PREFETCH", "2"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or None  # None -> one per core
+
+RESULT_CACHE_DIR = os.path.join(VISUAL_OUT_DIR, "cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Per-page results by page fingerprint, so revised uploads only reprocess changed pages
+PAGE_CACHE_DIR = os.path.join(VISUAL_OUT_DIR, "page_cache")
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+CHAT_TOP_K = int(os.getenv("CHAT_TOP_K", "4"))
+# document_id is a result-cache key (sha256 hex); it becomes a path on disk
+DOCUMENT_ID_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# Background jobs: uploads and SQLite state live outside "out", which is
+# served publicly.
+JOB_DIR = os.path.join(DATA_DIR, "visual_jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+
+# "ocr": Tesseract on every text box. "pdf": read born-digital PDFs from
+# their text layer and only OCR boxes / pages without one.
+TEXT_SOURCES = ("ocr", "pdf")
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 etl_pipeline = ETLPipeline(
     model_path=MODEL_PATH,
     page_image_dir=PAGE_IMAGE_DIR,
-    parsed_sections_dir=PARSED_SECTIONS_DIR
+    parsed_sections_dir=PARSED_SECTIONS_DIR,
+    ocr_workers=OCR_WORKERS
+)
+
+result_cache = ResultCache(
+    cache_dir=RESULT_CACHE_DIR,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    visual_labels=ETLPipeline.VISUAL_LABELS
 )
 
+page_cache = PageCache(
+    cache_dir=PAGE_CACHE_DIR,
+    max_bytes=PAGE_CACHE_MAX_BYTES,
+    visual_labels=ETLPipeline.VISUAL_LABELS
+)
+
+chat_indexes = IndexCache()
+
 # ------------------------
 # Upload & Parse Document
 # ------------------------
 
+def _save_upload(file: UploadFile, timings: Optional[dict] = None) -> tuple:
+    """Copy the upload to a temp file, hashing while copying so the cache lookup costs no extra pass."""
+    hasher = hashlib.sha256()
+    with span("upload", timings), tempfile.NamedTemporaryFile(
+        delete=False,
+        suffix=os.path.splitext(file.filename)[1]
+    ) as temp_file:
+        while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            temp_file.write(chunk)
+    logger.debug("📁 Temp file saved at %s (%d bytes)", temp_file.name, os.path.getsize(temp_file.name))
+    return temp_file.name, hasher.hexdigest()
+
+
+def _result_key(content_sha256: str, filename: str, text_source: str) -> str:
+    return make_result_key(
+        content_sha256,
+        ext=os.path.splitext(filename)[1].lower(),
+        dpi=RENDER_DPI,
+        model=checkpoint_fingerprint(MODEL_PATH),
+        text_source=text_source,
+        # Only part of the key when enabled, so existing entries stay valid
+        **({"detect_dpi": DETECT_DPI} if DETECT_DPI else {})
+    )
+
+
+def _process_upload(
+    temp_path: str,
+    content_sha256: str,
+    filename: str,
+    text_source: str,
+    debug: bool,
+    start_time: float,
+    timings: Optional[dict] = None,
+    namespace: Optional[str] = None
+):
+    """
+    Parse an uploaded document page by page.
+
+    Yields ``{"event": "start", "page_count"}`` once the page count is
+    known, ``{"event": "page", "page", "content"}`` as soon as each page is
+    parsed, then one ``{"event": "summary", ...}`` with timings, cache
+    status (``cache``: "hit" when the whole document came from the result
+    cache) and ``pages_reused`` (pages served from the page cache on a
+    miss). Stage seconds (upload / convert / render / detect / ocr /
+    crop_write / boxed_layout_write) accumulate in ``timings`` as pages
+    complete, and feed the ``etl_stage_seconds`` histogram. Removes
+    ``temp_path`` once done.
+
+    Crops and page images go to a fresh ``output_store`` namespace
+    (``namespace`` names it, e.g. a job id), protected from output GC
+    while the document is being parsed. Crops served from either cache are
+    linked into it too, so every returned path is under output GC rather
+    than inside a cache entry. Page images are only kept when ``debug`` is
+    set.
+    """
+    timings = {} if timings is None else timings
+    try:
+        cache_key = _result_key(content_sha256, filename, text_source)
+        time_to_first_page = None
+        pages_reused = 0
+        cached_pages = result_cache.get(cache_key)
+        base_filename = os.path.splitext(filename)[0]
+        outputs = output_store.namespace(namespace)
+
+        def exported(page_no: int, content: list) -> dict:
+            page_dir = os.path.join(outputs, f"{base_filename}_page_{page_no}")
+            return {"page": page_no, "content": export_crops(content, page_dir, ETLPipeline.VISUAL_LABELS)}
+
+        if cached_pages is not None:
+            logger.info("⚡ Cache hit: %s", cache_key)
+            yield {"event": "start", "page_count": len(cached_pages)}
+            with output_store.in_use(outputs):
+                for page in cached_pages:
+                    if time_to_first_page is None:
+                        time_to_first_page = time.time() - start_time
+                    yield {"event": "page", **exported(page["page"], page["content"])}
+            output = cached_pages
+            cache_status = "hit"
+        else:
+            output = []
+            with output_store.in_use(outputs), tempfile.TemporaryDirectory() as work_dir, ExitStack() as pdf_handles:
+                pdf_path = etl_pipeline.convert_document_to_pdf(temp_path, work_dir, timings)
+                yield {"event": "start", "page_count": etl_pipeline.count_pdf_pages(pdf_path)}
+                # Two-resolution mode re-renders regions while parsing; the
+                # document is closed once parsing ends, before work_dir goes
+                document = pdf_handles.enter_context(open_pdf(pdf_path)) if DETECT_DPI else None
+                rendered_pages = etl_pipeline.iter_pdf_pages(
+                    pdf_path,
+                    DETECT_DPI or RENDER_DPI,
+                    prefetch=RENDER_PREFETCH,
+                    with_text_layer=text_source == "pdf",
+                    save_as=base_filename if debug else None,
+                    timings=timings,
+                    region_dpi=RENDER_DPI if DETECT_DPI else None,
+                    save_dir=os.path.join(outputs, "pages"),
+                    document=document
+                )
+                page_output_dirs = (
+                    os.path.join(outputs, f"{base_filename}_page_{page_no}")
+                    for page_no in itertools.count(1)
+                )
+                page_results = page_cache.scoped(
+                    dpi=RENDER_DPI,
+                    detect_dpi=DETECT_DPI,
+                    model=checkpoint_fingerprint(MODEL_PATH),
+                    text_source=text_source
+                )
+                parsed_pages = etl_pipeline.parse_page_images(
+                    rendered_pages,
+                    page_output_dirs,
+                    batch_size=LAYOUT_BATCH_SIZE,
+                    timings=timings,
+                    page_cache=page_results
+                )
+
+                for i, parsed in enumerate(parsed_pages):
+                    page = exported(i + 1, parsed)
+                    if time_to_first_page is None:
+                        time_to_first_page = time.time() - start_time
+                    output.append(page)
+                    yield {"event": "page", **page}
+
+            pages_reused = page_results.reused
+            if pages_reused:
+                logger.info("♻️ Reused %d of %d pages from earlier uploads", pages_reused, len(output))
+            output = result_cache.put(cache_key, output)
+            cache_status = "miss"
+
+        DOCUMENTS.inc(cache=cache_status)
+        PAGES.inc(len(output))
+
+        yield {
+            "event": "summary",
+            "filename": filename,
+            "document_id": cache_key,
+            "page_count": len(output),
+            "time_to_first_page": round(time_to_first_page or 0.0, 2),
+            "processing_time": round(time.time() - start_time, 2),
+            "timings": timings,
+            "cache": cache_status,
+            "pages_reused": pages_reused,
+            "cache_stats": result_cache.stats()
+        }
+
+    except Exception:
+        logger.exception("❌ Document processing failed: %s", filename)
+        DOCUMENTS.inc(cache="error")
+        raise
+
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _check_text_source(text_source: str):
+    if text_source not in TEXT_SOURCES:
+        raise HTTPException(status_code=400, detail=f"text_source must be one of {TEXT_SOURCES}")
+
+
 @router.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    file: UploadFile = File(...),
+    text_source: str = Query("ocr"),
+    debug: bool = Query(False)
+):
+    start_time = time.time()
+    _check_text_source(text_source)
+    logger.info("📥 Upload received: %s (%s)", file.filename, file.content_type)
+
+    timings = {}
+    temp_path, content_sha256 = await run_in_stage("etl", _save_upload, file, timings)
+    events = _process_upload(temp_path, content_sha256, file.filename, text_source, debug, start_time, timings)
+
+    pages = []
+    summary = {}
+    async for event in iterate_in_stage("etl", events):
+        kind = event.pop("event")
+        if kind == "page":
+            pages.append(event)
+        elif kind == "summary":
+            summary = event
+
+    summary.pop("page_count", None)
+    return JSONResponse({
+        "filename": file.filename,
+        "pages": pages,
+        **summary
+    })
+
+
+@router.post("/upload/stream")
+async def upload_document_stream(
+    file: UploadFile = File(...),
+    text_source: str = Query("ocr"),
+    debug: bool = Query(False)
+):
+    """
+    Same as ``/upload`` but streams NDJSON: one ``page`` event per parsed
+    page, then a ``summary`` event. Lets clients start reading page 1 while
+    the rest of the document is still being processed.
+
+    The file type check, conversion and opening of the document happen
+    before the response starts, so those failures keep their 4xx/5xx
+    status. A failure after that ends the stream with
+    ``{"event": "error", "status", "error"}``.
+    """
     start_time = time.time()
-    print("📥 Upload received")
-    print("📄 Filename:", file.filename)
-    print("📄 Content-Type:", file.content_type)
+    _check_text_source(text_source)
+    logger.info("📥 Streaming upload received: %s", file.filename)
+
+    timings = {}
+    temp_path, content_sha256 = await run_in_stage("etl", _save_upload, file, timings)
+    events = iterate_in_stage(
+        "etl",
+        _process_upload(temp_path, content_sha256, file.filename, text_source, debug, start_time, timings)
+    )
+    # The "start" event comes once the document is converted and opened
+    first_event = await events.__anext__()
+
+    async def ndjson_lines():
+        yield json.dumps(first_event) + "\n"
+        try:
+            async for event in events:
+                yield json.dumps(event) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"event": "error", "status": e.status_code, "error": e.detail}) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "status": 500, "error": str(e)}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
-    try:
-        with tempfile.NamedTemporaryFile(
-            delete=False,
-            suffix=os.path.splitext(file.filename)[1]
-        ) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_path = temp_file.name
-
-        output = []
-
-        image_paths = etl_pipeline.convert_document_to_images(
-            temp_path,
-            file.filename
-        )
-        print("📁 Temp file saved at:", temp_path)
-        print("📁 Temp file size:", os.path.getsize(temp_path), "bytes")
 
-        for i, image_path in enumerate(image_paths):
-            page_no = i + 1
-            base_name = os.path.splitext(os.path.basename(image_path))[0]
-            page_output_dir = os.path.join(PARSED_SECTIONS_DIR, base_name)
+# ------------------------
+# Background Jobs
+# ------------------------
 
-            parsed = etl_pipeline.parse_image_layout(
-                image_path,
-                page_output_dir
-            )
+def _run_job(job: dict, timings: dict):
+    params = job["params"]
+    return _process_upload(
+        job["upload_path"],
+        params["content_sha256"],
+        job["filename"],
+        params["text_source"],
+        False,
+        time.time(),
+        timings,
+        namespace=job["id"]
+    )
 
-            output.append({
-                "page": page_no,
-                "content": parsed
-            })
 
-        return JSONResponse({
-            "filename": file.filename,
-            "pages": output,
-            "processing_time": round(time.time() - start_time, 2)
-        })
+def _job_outputs_exist(job: dict) -> bool:
+    """False once output GC has removed crops a finished job points at."""
+    return all(
+        os.path.isfile(item["content"])
+        for page in job["pages"]
+        for item in page["content"]
+        if item["tag"] in ETLPipeline.VISUAL_LABELS and item["content"]
+    )
 
-    except Exception as e:
-        print("❌ Error type:", type(e))
-        print("❌ Error message:", e)
-        raise
 
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+# Started by main.py's startup hook, so importing this module runs no jobs
+job_manager = JobManager(JOB_DIR, process=_run_job, workers=JOB_WORKERS, reusable=_job_outputs_exist)
+
+
+@router.post("/jobs")
+async def submit_document_job(file: UploadFile = File(...), text_source: str = Query("ocr")):
+    """
+    Queue a document for background processing and return its job id
+    straight away. Poll ``/jobs/{job_id}`` for progress and results.
+    """
+    _check_text_source(text_source)
+    logger.info("📥 Job upload received: %s", file.filename)
+
+    temp_path, content_sha256 = await run_in_stage("etl", _save_upload, file)
+    job_id, deduplicated = await run_in_stage(
+        "etl",
+        job_manager.submit,
+        temp_path,
+        _result_key(content_sha256, file.filename, text_source),
+        file.filename,
+        {"content_sha256": content_sha256, "text_source": text_source}
+    )
+    return {"job_id": job_id, "deduplicated": deduplicated}
+
+
+@router.get("/jobs/{job_id}")
+async def get_document_job(job_id: str):
+    job = await run_in_stage("io", job_manager.status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job["id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "error": job["error"],
+        "page_count": job["page_count"],
+        "pages_done": len(job["pages"]),
+        "pages": job["pages"],
+        "timings": job["timings"],
+        "summary": job["summary"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
 
 # ------------------------
 # Chat / Explain Content
 # ------------------------
 
+def _chat_index(payload: dict) -> BM25Index:
+    """
+    BM25 index for the document a chat question is about, reused across
+    questions. A ``document_id`` sent without ``pages`` must still resolve
+    (index or result cache), else 410 asks the client to re-send its pages.
+    """
+    document_id = payload.get("document_id")
+    pages = payload.get("pages")
+    if document_id and not (isinstance(document_id, str) and DOCUMENT_ID_PATTERN.fullmatch(document_id)):
+        raise HTTPException(status_code=400, detail="document_id must be the 64-character hex id returned by /upload")
+    if document_id and not pages:
+        index = chat_indexes.get(document_id)
+        if index is not None:
+            return index
+        pages = result_cache.get(document_id)
+        if pages is None:
+            raise HTTPException(status_code=410, detail="Document expired or unknown, re-send its pages")
+    if pages:
+        if not document_id:
+            document_id = hashlib.sha256(json.dumps(pages, sort_keys=True).encode("utf-8")).hexdigest()
+        return chat_indexes.get_or_build(document_id, pages)
+    return BM25Index(chunks_from_text(payload.get("content") or ""))
+
+
 @router.post("/chat")
 async def chat_with_document(payload: dict):
     """
     payload = {
-      "content": "...extracted text...",
+      "document_id": "...from /upload...",   (or "pages": [...] from /upload,
+      "content": "...extracted text...",      or plain "content")
       "history": "previous messages",
-      "question": "user query"
+      "question": "user query",
+      "top_k": 4                              (optional)
     }
+
+    Only the ``top_k`` sections most relevant to the question and the most
+    recent part of the history are sent to Gemini.
     """
 
     try:
-        gemini = genai.GenerativeModel(
-            "gemini-2.0-flash",
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-            },
+        question = payload.get("question") or ""
+        index = await run_in_stage("io", _chat_index, payload)
+        sections = index.search(question, top_k=int(payload.get("top_k") or CHAT_TOP_K))
+
+        prompt = build_chat_prompt(
+            format_sections(sections),
+            window_history(payload.get("history")),
+            question
         )
 
-        prompt = f"""
-You are an accessibility assistant for visually impaired users.
+        answer = await llm_gateway.agenerate(prompt, model="gemini-2.0-flash", safety="none")
 
-Document content:
-{payload.get("content")}
+        return {
+            "answer": answer,
+            "sources": [{"page": c["page"], "tags": c["tags"]} for c in sections],
+            "prompt_tokens": estimate_tokens(prompt)
+        }
 
-Conversation history:
-{payload.get("history")}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-User question:
-{payload.get("question")}
-"""
+def _page_speech_segments(pages: list) -> list:
+    """One speech segment per page, so unchanged pages come from the TTS cache."""
+    page_segments = []
 
-        response = gemini.generate_content(prompt)
+    for page in pages:
+        speech_lines = [f"Page {page['page']}."]
 
-        return {"answer": response.text}
+        for item in page["content"]:
+            speech_text = normalize_for_speech(
+                item["tag"],
+                item["content"]
+            )
+            speech_lines.append(speech_text)
+
+        page_segments.append(" ".join(speech_lines))
+
+    return page_segments
+
+
+def _check_audio_format(audio_format: str):
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {tuple(AUDIO_FORMATS)}")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/tts")
 async def generate_audio_from_document(payload: dict):
@@ -141,31 +503,87 @@ async def generate_audio_from_document(payload: dict):
             {"tag": "List-item", "content": "Example"}
           ]
         }
-      ]
+      ],
+      "format": "wav" | "mp3" | "opus"   (optional, default "wav")
     }
     """
 
     pages = payload.get("pages")
     if not pages:
         raise HTTPException(status_code=400, detail="Pages required")
+    audio_format = payload.get("format", "wav")
+    _check_audio_format(audio_format)
 
-    speech_lines = []
-
-    for page in pages:
-        speech_lines.append(f"Page {page['page']}.")
-
-        for item in page["content"]:
-            speech_text = normalize_for_speech(
-                item["tag"],
-                item["content"]
-            )
-            speech_lines.append(speech_text)
-
-    final_text = " ".join(speech_lines)
+    page_segments = _page_speech_segments(pages)
+    final_text = " ".join(page_segments)
 
-    audio_path = generate_tts_audio(final_text)
+    try:
+        # Admission is checked here, before the job can queue in the "tts" stage
+        with tts_pool.admit():
+            audio_path = await run_in_stage("tts", generate_tts_audio_segments, page_segments, audio_format)
+    except TTSQueueFull:
+        raise HTTPException(status_code=503, detail="Speech synthesis is busy, please retry shortly")
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Speech synthesis timed out")
 
     return {
         "audio_path": audio_path,
         "spoken_text": final_text
     }
+
+
+@router.post("/tts/stream")
+async def stream_audio_from_document(payload: dict):
+    """
+    Same payload as ``/tts`` (``format`` defaults to "mp3"), but returns the
+    audio itself as a chunked stream. Pages are synthesized in order and
+    sent as soon as each is ready, so playback starts after the first page.
+    """
+    pages = payload.get("pages")
+    if not pages:
+        raise HTTPException(status_code=400, detail="Pages required")
+    audio_format = payload.get("format", "mp3")
+    _check_audio_format(audio_format)
+
+    try:
+        tts_pool.try_admit()
+    except TTSQueueFull:
+        raise HTTPException(status_code=503, detail="Speech synthesis is busy, please retry shortly")
+
+    async def audio():
+        # The slot is held for the whole stream and released when it ends or the client leaves
+        try:
+            chunks = stream_tts_audio(_page_speech_segments(pages), audio_format)
+            async for chunk in iterate_in_stage("tts", chunks):
+                yield chunk
+        finally:
+            tts_pool.release()
+
+    return StreamingResponse(audio(), media_type=AUDIO_FORMATS[audio_format]["media_type"])
+
+
+@router.get("/tts/metrics")
+async def tts_metrics():
+    return tts_pool.metrics()
+
+
+def warmup_models() -> dict:
+    """Preload the YOLO model with a dummy inference and start the TTS workers (blocking)."""
+    timings = etl_pipeline.warmup()
+    start = time.perf_counter()
+    tts_pool.warmup()
+    timings["tts_workers"] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+@router.post("/warmup")
+async def warmup():
+    """Pay model start-up costs now rather than on the first upload."""
+    already_loaded = etl_pipeline.model_loaded
+    timings = await run_in_stage("etl", warmup_models)
+    return {"already_loaded": already_loaded, "timings": timings}
+
+
+@router.get("/convert/metrics")
+async def convert_metrics():
+    return office_pool.metrics()
@@ -0,0 +1,114 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+
+class CaptionIndex:
+    """
+    Compact, time-sorted caption store for one video.
+
+    Caption start times and durations live in flat ``array('d')`` columns
+    so "what is on screen at t" and "everything between t0 and t1" are
+    binary searches instead of scans over the raw event JSON. Paragraphs
+    keep their time span and the offset of their first caption.
+    """
+
+    def __init__(self, captions: List[dict], paragraphs: List[dict]):
+        # clean_caption_events output is already in playback order; sort defensively
+        captions = sorted(captions, key=lambda cap: cap["start"])
+        self.starts = array("d", (cap["start"] for cap in captions))
+        self.durations = array("d", (cap["duration"] for cap in captions))
+        self.texts = [cap["text"] for cap in captions]
+        # Bounds how far back a caption that is still showing at t0 can have started
+        self.max_duration = max(self.durations, default=0.0)
+
+        self.para_starts = array("d", (para["start"] for para in paragraphs))
+        self.para_ends = array("d", (para["end"] for para in paragraphs))
+        self.para_texts = [para["text"] for para in paragraphs]
+        self.para_offsets = array("l", (bisect_left(self.starts, para["start"]) for para in paragraphs))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def duration(self) -> float:
+        if not self.starts:
+            return 0.0
+        return max(start + length for start, length in zip(self.starts, self.durations))
+
+    def caption(self, index: int) -> dict:
+        return {
+            "index": index,
+            "start": self.starts[index],
+            "duration": self.durations[index],
+            "text": self.texts[index],
+        }
+
+    def paragraph(self, index: int) -> dict:
+        return {
+            "index": index,
+            "start": self.para_starts[index],
+            "end": self.para_ends[index],
+            "caption_offset": self.para_offsets[index],
+            "text": self.para_texts[index],
+        }
+
+    def active(self, t: float) -> Optional[int]:
+        """Index of the caption showing at ``t`` (the latest one to start), or ``None`` in a gap."""
+        index = bisect_right(self.starts, t) - 1
+        if index >= 0 and t < self.starts[index] + self.durations[index]:
+            return index
+        return None
+
+    def active_paragraph(self, t: float) -> Optional[int]:
+        index = bisect_right(self.para_starts, t) - 1
+        if index >= 0 and t <= self.para_ends[index]:
+            return index
+        return None
+
+    def window(self, t0: float, t1: float) -> List[dict]:
+        """Captions overlapping ``[t0, t1)``, in playback order."""
+        lo = bisect_left(self.starts, t0 - self.max_duration)
+        hi = bisect_left(self.starts, t1)
+        return [
+            self.caption(i) for i in range(lo, hi)
+            if self.starts[i] + self.durations[i] > t0
+        ]
+
+    def paragraph_window(self, t0: float, t1: float) -> List[dict]:
+        """Paragraphs overlapping ``[t0, t1)``; paragraphs never overlap each other."""
+        lo = max(bisect_right(self.para_starts, t0) - 1, 0)
+        hi = bisect_left(self.para_starts, t1)
+        return [
+            self.paragraph(i) for i in range(lo, hi)
+            if self.para_ends[i] > t0
+        ]
+
+
+class CaptionIndexCache:
+    """Small in-memory LRU of caption indexes by key (video id + variant)."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CaptionIndex]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def get_or_build(self, key: str, build: Callable[[], CaptionIndex]) -> CaptionIndex:
+        index = self.get(key)
+        if index is not None:
+            return index
+        index = build()
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+ENTRY_FILE = "entry.json"
+# Empty marker whose mtime is when the entry was stored; never touched after
+STORED_FILE = ".stored"
+
+
+class DiskCache:
+    """
+    Directory-per-entry cache on local disk.
+
+    Every key owns a folder holding ``entry.json`` (the cached payload) plus
+    any files copied in alongside it. The mtime of ``entry.json`` doubles as
+    the last-access time, so eviction is LRU across restarts without a
+    separate index. ``ttl_seconds`` counts from when the entry was stored
+    (the mtime of its ``.stored`` marker), however often it is read since:
+    older entries are treated as misses.
+    """
+
+    def __init__(self, root: str, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, key: str) -> Optional[dict]:
+        entry_path = os.path.join(self.entry_dir(key), ENTRY_FILE)
+        try:
+            if self._expired(self.entry_dir(key)):
+                self.delete(key)
+                raise FileNotFoundError(entry_path)
+            with open(entry_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            os.utime(entry_path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: dict, files: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Store ``payload`` under ``key``. ``files`` maps a path relative to the
+        entry folder to a source file that is copied in. The entry is staged
+        in a temp folder and renamed into place so readers never see a
+        half-written entry.
+        """
+        staging_dir = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(staging_dir)
+        try:
+            for rel_path, src_path in (files or {}).items():
+                dst_path = os.path.join(staging_dir, rel_path)
+                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                shutil.copyfile(src_path, dst_path)
+            with open(os.path.join(staging_dir, ENTRY_FILE), "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            open(os.path.join(staging_dir, STORED_FILE), "w").close()
+
+            with self._lock:
+                target_dir = self.entry_dir(key)
+                if os.path.exists(target_dir):
+                    shutil.rmtree(target_dir, ignore_errors=True)
+                os.rename(staging_dir, target_dir)
+                self._evict_locked(keep=key)
+        finally:
+            if os.path.exists(staging_dir):
+                shutil.rmtree(staging_dir, ignore_errors=True)
+        return payload
+
+    def delete(self, key: str) -> None:
+        shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict_locked()
+
+    def _expired(self, entry_dir: str) -> bool:
+        if self.ttl_seconds is None:
+            return False
+        return time.time() - _stored_at(entry_dir) > self.ttl_seconds
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            entry_path = os.path.join(entry_dir, ENTRY_FILE)
+            if name.startswith(".tmp-") or not os.path.isfile(entry_path):
+                continue
+            size = _dir_size(entry_dir)
+            total_bytes += size
+            entries.append((os.path.getmtime(entry_path), name, size))
+
+        # Oldest access first
+        entries.sort()
+        for accessed_at, name, size in entries:
+            expired = self._expired(os.path.join(self.root, name))
+            if not expired and total_bytes <= self.max_bytes:
+                continue
+            if name == keep and not expired:
+                continue
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total_bytes -= size
+
+
+def _stored_at(entry_dir: str) -> float:
+    try:
+        return os.path.getmtime(os.path.join(entry_dir, STORED_FILE))
+    except FileNotFoundError:
+        # Entries written before the marker existed: last access is all we have
+        return os.path.getmtime(os.path.join(entry_dir, ENTRY_FILE))
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
@@ -1,112 +1,441 @@
 from typing import List
 import os
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
+import numpy as np
+import hashlib
 import json
+import logging
 import tempfile
 import subprocess
+from contextlib import contextmanager
 import fitz
 import shutil
 from PIL import Image
-import google.generativeai as genai
 import pytesseract
-from ultralytics import YOLO
 from fastapi import HTTPException
-from typing import TypedDict, List, Dict, Any, Optional, Annotated
+from services.metrics import add_timing, span
+from services.office_converter import OFFICE_EXTENSIONS, office_pool
+from typing import TypedDict, List, Dict, Any, Iterable, Iterator, Optional, Annotated
 from pydantic import BaseModel, Field
 
+# Per-page / per-box messages are DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger(__name__)
+
+# MuPDF is not thread-safe across the process, not just per document: every
+# fitz call (open / close, load_page, get_pixmap, get_text, ...) from any
+# upload, job or render thread holds this lock. Held per page or region, so
+# concurrent uploads interleave and detection / OCR still run unlocked.
+MUPDF_LOCK = threading.RLock()
+
+
+@contextmanager
+def open_pdf(pdf_path: str):
+    """``fitz.open`` whose open and close both run under ``MUPDF_LOCK``."""
+    with MUPDF_LOCK:
+        doc = fitz.open(pdf_path)
+    try:
+        yield doc
+    finally:
+        with MUPDF_LOCK:
+            doc.close()
+
 
 class ETLPipeline:
 
     VISUAL_LABELS = ['Picture', 'Table', 'Formula']
 
-    def __init__(self, model_path: str, page_image_dir: str, parsed_sections_dir: str):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path: str, page_image_dir: str, parsed_sections_dir: str, ocr_workers: Optional[int] = None):
+        # The YOLO checkpoint (and ultralytics/torch) load on first use, see ``model``
+        self.model_path = model_path
+        self._model = None
+        self._model_lock = threading.Lock()
         self.page_image_dir = page_image_dir
         self.parsed_sections_dir = parsed_sections_dir
-        # self.llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.3)
-        self.gemini = genai.GenerativeModel("gemini-2.0-flash")
+        # Each pytesseract call runs tesseract as its own subprocess, so a
+        # thread pool is enough to keep every core busy. Tesseract's own
+        # OpenMP threading is capped to avoid oversubscribing the cores.
+        self.ocr_workers = ocr_workers or os.cpu_count() or 1
+        if self.ocr_workers > 1:
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        self.ocr_pool = ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix="ocr")
+        # LLM calls go through services.llm_gateway; the pipeline itself needs none
         os.makedirs(self.page_image_dir, exist_ok=True)
         os.makedirs(self.parsed_sections_dir, exist_ok=True)
-        os.environ["GOOGLE_API_KEY"] = ""
-        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
 
-    def _render_pdf_to_all_images(self, pdf_path: str, base_filename: str, dpi: int) -> List[str]:
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    from ultralytics import YOLO
+                    self._model = YOLO(self.model_path)
+                    logger.info("🧠 YOLO model loaded in %.2fs", time.perf_counter() - start)
+        return self._model
+
+    @property
+    def model_loaded(self) -> bool:
+        return self._model is not None
+
+    def warmup(self) -> Dict[str, float]:
+        """Load the model and run one dummy page through it, so the first upload doesn't pay for either."""
+        start = time.perf_counter()
+        model = self.model
+        loaded = time.perf_counter()
+        model(np.full((640, 640, 3), 255, dtype=np.uint8), verbose=False)
+        return {
+            "load": round(loaded - start, 3),
+            "first_inference": round(time.perf_counter() - loaded, 3),
+        }
+
+    def render_pdf_to_images(self, pdf_path: str, base_filename: str, dpi: int) -> List[str]:
         image_paths = []
         try:
-            with fitz.open(pdf_path) as doc:
-                for page_num in range(len(doc)):
-                    print(f"📄 Rendering page {page_num + 1}")
-                    page = doc.load_page(page_num)
-                    zoom_factor = dpi / 72.0
-                    matrix = fitz.Matrix(zoom_factor, zoom_factor)
-                    pixmap = page.get_pixmap(matrix=matrix)
+            with open_pdf(pdf_path) as doc:
+                with MUPDF_LOCK:
+                    page_count = doc.page_count
+                for page_num in range(page_count):
+                    logger.debug("📄 Rendering page %d", page_num + 1)
                     output_image_path = os.path.join(self.page_image_dir, f"{base_filename}_page_{page_num + 1}.jpg")
-                    pixmap.save(output_image_path)
-                    print("🖼️ Image saved to:", output_image_path)
+                    with MUPDF_LOCK:
+                        page = doc.load_page(page_num)
+                        zoom_factor = dpi / 72.0
+                        matrix = fitz.Matrix(zoom_factor, zoom_factor)
+                        pixmap = page.get_pixmap(matrix=matrix)
+                        pixmap.save(output_image_path)
+                    logger.debug("🖼️ Image saved to: %s", output_image_path)
                     image_paths.append(output_image_path)
             return image_paths
-        except Exception as e:
-            print("❌ PDF IMAGE RENDER FAILED")
-            print("❌ Error type:", type(e))
-            print("❌ Error message:", e)
+        except Exception:
+            logger.exception("❌ PDF image render failed")
             raise
 
-    def convert_document_to_images(self, input_path: str, original_filename: str, dpi: int = 300) -> List[str]:
-        print("🧩 Converting document to images")
-        print("📄 Input path:", input_path)
-        print("📄 Original filename:", original_filename)
+    def convert_document_to_pdf(self, input_path: str, work_dir: str, timings: Optional[Dict[str, float]] = None) -> str:
+        """
+        Return a PDF for ``input_path``: PDFs are used as-is, Office documents
+        are converted by the warm LibreOffice pool into ``work_dir`` (the
+        caller owns its lifetime, so the PDF text layer stays available after
+        rendering).
+        """
         file_extension = os.path.splitext(input_path)[1].lower()
-        base_filename = os.path.splitext(original_filename)[0]
-        image_paths = []
         if file_extension == '.pdf':
-            image_paths = self._render_pdf_to_all_images(input_path, base_filename, dpi)
-        elif file_extension in ['.docx', '.doc', '.pptx', '.ppt', '.xlsx', '.xls']:
-            try:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    subprocess.run([
-                        "libreoffice", "--headless", "--convert-to", "pdf:writer_pdf_Export",
-                        "--outdir", temp_dir, input_path,
-                    ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    intermediate_pdf = os.path.join(temp_dir, os.path.splitext(os.path.basename(input_path))[0] + ".pdf")
-                    if not os.path.exists(intermediate_pdf):
-                        raise FileNotFoundError("LibreOffice failed to create the intermediate PDF.")
-                    image_paths = self._render_pdf_to_all_images(intermediate_pdf, base_filename, dpi)
-            except FileNotFoundError:
-                raise HTTPException(status_code=500, detail="LibreOffice not found. Please ensure it's installed.")
-            except subprocess.CalledProcessError as e:
-                raise HTTPException(status_code=500, detail=f"LibreOffice conversion failed: {e.stderr.decode()}")
-        else:
+            return input_path
+        if file_extension not in OFFICE_EXTENSIONS:
             raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
-        print("🖼️ Total images generated:", len(image_paths))
-        for p in image_paths:
-            print("   -", p)
+        try:
+            with span("convert", timings):
+                return office_pool.convert(input_path, work_dir)
+        except FileNotFoundError:
+            raise HTTPException(status_code=500, detail="LibreOffice not found. Please ensure it's installed.")
+        except subprocess.CalledProcessError as e:
+            raise HTTPException(status_code=500, detail=f"LibreOffice conversion failed: {e.stderr.decode()}")
+        except (subprocess.TimeoutExpired, TimeoutError) as e:
+            raise HTTPException(status_code=504, detail=f"LibreOffice conversion timed out: {e}")
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=f"LibreOffice conversion failed: {e}")
+
+    def count_pdf_pages(self, pdf_path: str) -> int:
+        try:
+            with open_pdf(pdf_path) as doc, MUPDF_LOCK:
+                return doc.page_count
+        except (RuntimeError, ValueError) as e:
+            # fitz raises these (FileDataError is a RuntimeError) for corrupt or non-PDF input
+            raise HTTPException(status_code=400, detail=f"Could not open document: {e}")
+
+    def convert_document_to_images(self, input_path: str, original_filename: str, dpi: int = 300) -> List[str]:
+        logger.info("🧩 Converting %s (%s) to images", original_filename, input_path)
+        base_filename = os.path.splitext(original_filename)[0]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = self.convert_document_to_pdf(input_path, temp_dir)
+            image_paths = self.render_pdf_to_images(pdf_path, base_filename, dpi)
+        logger.info("🖼️ Total images generated: %d", len(image_paths))
         return image_paths
 
+    def detect_layouts(self, images: List[Any], batch_size: int = 1) -> List[Any]:
+        """Run YOLO layout detection over page images, ``batch_size`` pages per forward pass."""
+        results = []
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            logger.debug("🚀 YOLO batch: pages %d-%d", start + 1, start + len(batch))
+            results.extend(self.model(batch, verbose=False))
+        return results
+
+    def _render_page(self, page, page_num: int, matrix, save_as: Optional[str], save_dir: Optional[str] = None):
+        logger.debug("📄 Rendering page %d", page_num + 1)
+        if save_as:
+            save_dir = save_dir or self.page_image_dir
+            os.makedirs(save_dir, exist_ok=True)
+        with MUPDF_LOCK:
+            pixmap = page.get_pixmap(matrix=matrix, colorspace=fitz.csRGB, alpha=False)
+            if save_as:
+                output_image_path = os.path.join(save_dir, f"{save_as}_page_{page_num + 1}.jpg")
+                pixmap.save(output_image_path)
+                logger.debug("🖼️ Image saved to: %s", output_image_path)
+            return pixmap_to_bgr(pixmap)
+
+    def iter_pdf_pages(
+        self,
+        pdf_path: str,
+        dpi: int,
+        prefetch: int = 2,
+        with_text_layer: bool = False,
+        save_as: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None,
+        region_dpi: Optional[int] = None,
+        save_dir: Optional[str] = None,
+        document=None
+    ) -> Iterator[tuple]:
+        """
+        Render PDF pages lazily as in-memory BGR arrays.
+
+        A background thread renders ahead into a queue bounded by
+        ``prefetch`` pages, so rendering overlaps with detection/OCR of
+        earlier pages while at most ``prefetch`` pages wait in memory.
+        Yields ``(image, text_layer, region_renderer)`` per page;
+        ``text_layer`` is a ``PdfTextLayer`` when ``with_text_layer`` is
+        set, else ``None``. Page images are only written to ``save_dir``
+        (default ``page_image_dir``) when ``save_as`` (a base filename) is
+        given, for debugging. Render seconds are added to ``timings["render"]`` when a
+        dict is passed.
+
+        With ``region_dpi``, pages are rendered at the (low) ``dpi`` for
+        layout detection only, and each page comes with a
+        ``PdfRegionRenderer`` that re-renders detected boxes from the PDF at
+        ``region_dpi`` for OCR and crops. Region renders touch the PDF from
+        the consuming thread, so this mode renders inline, without the
+        prefetch thread. The renderers outlive this generator (the last
+        batch is parsed after it is exhausted), so the caller passes the
+        open ``document`` (see ``open_pdf``) and closes it once every page
+        is parsed.
+        """
+        if region_dpi:
+            if document is None:
+                raise ValueError("two-resolution rendering needs an open document from open_pdf()")
+            yield from self._iter_pdf_pages_two_resolution(document, dpi, region_dpi, with_text_layer, save_as, timings, save_dir)
+            return
+
+        pages = queue.Queue(maxsize=max(prefetch, 1))
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def render():
+            # This document is only used from this thread, and every fitz
+            # call takes MUPDF_LOCK against other uploads' render threads.
+            try:
+                with open_pdf(pdf_path) as doc:
+                    zoom_factor = dpi / 72.0
+                    matrix = fitz.Matrix(zoom_factor, zoom_factor)
+                    with MUPDF_LOCK:
+                        page_count = doc.page_count
+                    for page_num in range(page_count):
+                        render_start = time.perf_counter()
+                        with MUPDF_LOCK:
+                            page = doc.load_page(page_num)
+                            image = self._render_page(page, page_num, matrix, save_as, save_dir)
+                            text_layer = PdfTextLayer(page, dpi) if with_text_layer else None
+                        add_timing(timings, "render", time.perf_counter() - render_start)
+                        if not put((image, text_layer, None)):
+                            return
+                put(None)
+            except Exception as e:
+                logger.exception("❌ PDF image render failed")
+                put(e)
+
+        renderer = threading.Thread(target=render, name="pdf-render", daemon=True)
+        renderer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            renderer.join()
+
+    def _iter_pdf_pages_two_resolution(
+        self,
+        doc,
+        dpi: int,
+        region_dpi: int,
+        with_text_layer: bool,
+        save_as: Optional[str],
+        timings: Optional[Dict[str, float]],
+        save_dir: Optional[str] = None
+    ) -> Iterator[tuple]:
+        with MUPDF_LOCK:
+            page_count = doc.page_count
+        zoom_factor = dpi / 72.0
+        matrix = fitz.Matrix(zoom_factor, zoom_factor)
+        for page_num in range(page_count):
+            with span("render", timings), MUPDF_LOCK:
+                page = doc.load_page(page_num)
+                image = self._render_page(page, page_num, matrix, save_as, save_dir)
+                text_layer = PdfTextLayer(page, dpi) if with_text_layer else None
+            yield image, text_layer, PdfRegionRenderer(page, dpi, region_dpi, timings)
+
+    def parse_image_layouts(
+        self,
+        image_paths: List[str],
+        output_dirs: List[str],
+        batch_size: int = 8,
+        pdf_path: Optional[str] = None,
+        dpi: int = 300
+    ) -> Iterator[List[dict]]:
+        """
+        Batched counterpart of ``parse_image_layout`` for page images on
+        disk. When ``pdf_path`` is given (the PDF the images were rendered
+        from at ``dpi``), text-like boxes are read from the PDF text layer
+        and only fall back to OCR where it has no text.
+        """
+        with MUPDF_LOCK:
+            pdf_doc = fitz.open(pdf_path) if pdf_path else None
+
+        def text_layer(i: int) -> Optional[PdfTextLayer]:
+            if pdf_doc is None:
+                return None
+            with MUPDF_LOCK:
+                return PdfTextLayer(pdf_doc[i], dpi)
+
+        try:
+            pages = (
+                (self._load_image(image_path), text_layer(i), None)
+                for i, image_path in enumerate(image_paths)
+            )
+            yield from self.parse_page_images(pages, output_dirs, batch_size)
+        finally:
+            if pdf_doc is not None:
+                with MUPDF_LOCK:
+                    pdf_doc.close()
+
+    def parse_page_images(
+        self,
+        pages: Iterable[tuple],
+        output_dirs: Iterable[str],
+        batch_size: int = 8,
+        timings: Optional[Dict[str, float]] = None,
+        page_cache=None
+    ) -> Iterator[List[dict]]:
+        """
+        Parse ``(image, text_layer, region_renderer)`` pages (see
+        ``iter_pdf_pages``): detect ``batch_size`` pages per
+        YOLO forward pass, then crop and OCR each page's detections on their
+        own. Both arguments are consumed lazily, so a render generator can
+        feed this directly. Yields one page's content at a time, in order.
+        Detection and crop/OCR seconds are added to ``timings["detect"]`` and
+        ``timings["ocr"]`` when a dict is passed; ``ocr`` includes the
+        ``crop_write`` / ``boxed_layout_write`` spans recorded inside it.
+
+        With a ``page_cache`` (``get(fingerprint)`` / ``put(fingerprint,
+        content)``, see ``result_cache.ScopedPageCache``), pages whose
+        ``page_fingerprint`` was seen before reuse the stored content and
+        skip detection and OCR entirely.
+        """
+        pending = zip(pages, output_dirs)
+        while batch := list(itertools.islice(pending, batch_size)):
+            fingerprints = [None] * len(batch)
+            reused = [None] * len(batch)
+            if page_cache is not None:
+                with span("fingerprint", timings):
+                    for i, ((source_img, text_layer, _), _) in enumerate(batch):
+                        if source_img is not None:
+                            fingerprints[i] = page_fingerprint(source_img, text_layer)
+                            reused[i] = page_cache.get(fingerprints[i])
+
+            loaded = [
+                page[0] for (page, _), hit in zip(batch, reused)
+                if page[0] is not None and hit is None
+            ]
+            detect_start = time.perf_counter()
+            results = iter(self.detect_layouts(loaded, batch_size=len(loaded)) if loaded else [])
+            add_timing(timings, "detect", time.perf_counter() - detect_start)
+            for ((source_img, text_layer, region_renderer), output_dir), fingerprint, hit in zip(batch, fingerprints, reused):
+                if source_img is None:
+                    yield []
+                    continue
+                if hit is not None:
+                    yield hit
+                    continue
+                ocr_start = time.perf_counter()
+                page_content = self._extract_regions(
+                    source_img, next(results), output_dir, text_layer, timings, region_renderer
+                )
+                add_timing(timings, "ocr", time.perf_counter() - ocr_start)
+                if fingerprint is not None:
+                    page_content = page_cache.put(fingerprint, page_content)
+                yield page_content
+
+    def _load_image(self, image_path: str):
+        source_img = cv2.imread(image_path)
+        if source_img is None:
+            logger.warning("❌ Failed to load image: %s", image_path)
+        return source_img
+
     def parse_image_layout(self, source_image_path: str, output_dir: str) -> List[dict]:
-        print("\n🔍 Parsing image:", source_image_path)
+        logger.debug("🔍 Parsing image: %s", source_image_path)
+        source_img = self._load_image(source_image_path)
+        if source_img is None:
+            return []
+        logger.debug("📐 Image shape: %s, model loaded: %s", source_img.shape, self.model_loaded)
+        try:
+            with span("detect"):
+                result = self.detect_layouts([source_img])[0]
+        except Exception:
+            logger.exception("❌ Layout detection failed: %s", source_image_path)
+            raise
+        return self._extract_regions(source_img, result, output_dir)
+
+    def _extract_regions(
+        self,
+        source_img,
+        result,
+        output_dir: str,
+        text_layer: Optional["PdfTextLayer"] = None,
+        timings: Optional[Dict[str, float]] = None,
+        region_renderer: Optional["PdfRegionRenderer"] = None
+    ) -> List[dict]:
+        """
+        Crop / OCR the detections of one page in top-to-bottom reading order.
+        Crop and boxed-layout writes are recorded as ``crop_write`` and
+        ``boxed_layout_write`` spans. With a ``region_renderer``, crops are
+        re-rendered from the PDF at its higher DPI instead of cut out of
+        ``source_img``, and only for boxes that need pixels.
+        """
+
+        def crop(x1, y1, x2, y2):
+            if region_renderer is not None:
+                region = region_renderer(x1, y1, x2, y2)
+                if region is not None:
+                    return region
+            return source_img[y1:y2, x1:x2]
+
+        if text_layer is not None and not text_layer.has_text:
+            logger.debug("🖨️ No PDF text layer on this page, using OCR")
+            text_layer = None
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         page_content = []
         try:
-            source_img = cv2.imread(source_image_path)
-            if source_img is None:
-                print("❌ Failed to load image:", source_image_path)
-                return []
-            else:
-                print("✅ Image loaded:", source_img.shape)
-            print("\n🤖 YOLO DEBUG")
-            print("📂 Image path:", source_image_path)
-            print("📐 Image shape:", source_img.shape)
-            print("🧠 Model loaded:", self.model is not None)
-            print("🚀 About to run YOLO inference...")
-            results = self.model(source_img)
-            result = results[0]
-            print("✅ YOLO inference finished")
-            print("📦 Boxes detected:", len(result.boxes))
-            print("🏷️ Class labels:", result.names)
+            logger.debug("📦 Boxes detected: %d", len(result.boxes))
             class_names = result.names
             class_counts = {}
             detections = []
+            ocr_jobs = []
             # For drawing bounding boxes
             boxed_img = source_img.copy()
             for box in result.boxes:
@@ -122,31 +451,131 @@ class ETLPipeline:
                 color = (255, 0, 255)  # Green for all boxes, can be customized
                 cv2.rectangle(boxed_img, (x1, y1), (x2, y2), color, 3)
                 cv2.putText(boxed_img, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                cropped_image = source_img[y1:y2, x1:x2]
                 content_data = ""
                 if label in self.VISUAL_LABELS:
                     count = class_counts.get(label, 0)
                     filename = f"{label}_{count}.png"
                     save_path = os.path.join(output_dir, filename)
                     class_counts[label] = count + 1
-                    cv2.imwrite(save_path, cropped_image)
+                    with span("crop_write", timings):
+                        cv2.imwrite(save_path, crop(x1, y1, x2, y2))
                     content_data = save_path
                 else:
-                    pil_image = Image.fromarray(cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB))
-                    text = pytesseract.image_to_string(pil_image, lang='eng')
-                    content_data = text.strip()
+                    if text_layer is not None:
+                        content_data = text_layer.text_in_box(x1, y1, x2, y2)
+                    if not content_data:
+                        ocr_jobs.append((len(page_content), self.ocr_pool.submit(ocr_region, crop(x1, y1, x2, y2))))
                 page_content.append({
                     "tag": label,
                     "content": content_data
                 })
+            # Fill OCR results back into their reading-order slots
+            for index, future in ocr_jobs:
+                page_content[index]["content"] = future.result()
             # Save the image with bounding boxes
             boxed_img_path = os.path.join(output_dir, "boxed_layout.png")
-            cv2.imwrite(boxed_img_path, boxed_img)
-        except Exception as e:
-            print("❌ PARSE IMAGE ERROR:", e)
+            with span("boxed_layout_write", timings):
+                cv2.imwrite(boxed_img_path, boxed_img)
+        except Exception:
+            logger.exception("❌ Region extraction failed")
             raise
         return page_content
 
+    def ocr_regions(self, cropped_images: List[Any]) -> List[str]:
+        """OCR several crops on the worker pool, returning text in input order."""
+        return list(self.ocr_pool.map(ocr_region, cropped_images))
+
+
+class PdfTextLayer:
+    """
+    Words of a PDF page's text layer in rendered-image pixel coordinates.
+
+    Words are pulled out once on construction (under ``MUPDF_LOCK``), so
+    ``text_in_box`` is plain Python and can run on another thread than the
+    one that owns the PDF.
+    """
+
+    def __init__(self, page, dpi: int):
+        zoom_factor = dpi / 72.0
+        with MUPDF_LOCK:
+            # Rendered pixmaps follow the page rotation, the text layer does not
+            to_pixels = page.rotation_matrix * fitz.Matrix(zoom_factor, zoom_factor)
+            raw_words = page.get_text("words")
+        self.words = []
+        for x0, y0, x1, y1, word, block_no, line_no, word_no in raw_words:
+            rect = fitz.Rect(x0, y0, x1, y1) * to_pixels
+            self.words.append(((rect.x0 + rect.x1) / 2, (rect.y0 + rect.y1) / 2, block_no, line_no, word_no, word))
+        # Scanned pages carry no text layer at all
+        self.has_text = bool(self.words)
+
+    def text_in_box(self, x1: int, y1: int, x2: int, y2: int) -> str:
+        lines = {}
+        for cx, cy, block_no, line_no, word_no, word in self.words:
+            if x1 <= cx <= x2 and y1 <= cy <= y2:
+                lines.setdefault((block_no, line_no), []).append((word_no, word))
+        return "\n".join(
+            " ".join(word for _, word in sorted(words))
+            for _, words in sorted(lines.items())
+        )
+
+
+class PdfRegionRenderer:
+    """
+    Re-renders boxes found on a page image rendered at ``dpi`` straight
+    from the PDF page at ``region_dpi``, so OCR and crops get full
+    resolution without rendering (and holding) the whole page at it.
+    """
+
+    # Low-resolution pixels added around each box, to absorb rounding at
+    # the coarser detection scale
+    PADDING = 2
+
+    def __init__(self, page, dpi: int, region_dpi: int, timings: Optional[Dict[str, float]] = None):
+        self.page = page
+        # Rendered pixels -> page coordinates; like the page pixmap, clips
+        # are given in the (rotated) ``page.rect`` space
+        self.to_page = fitz.Matrix(72.0 / dpi, 72.0 / dpi)
+        self.matrix = fitz.Matrix(region_dpi / 72.0, region_dpi / 72.0)
+        self.timings = timings
+
+    def __call__(self, x1: int, y1: int, x2: int, y2: int) -> Optional[np.ndarray]:
+        pad = self.PADDING
+        with MUPDF_LOCK:
+            clip = (fitz.Rect(x1 - pad, y1 - pad, x2 + pad, y2 + pad) * self.to_page) & self.page.rect
+        if clip.is_empty:
+            return None
+        with span("region_render", self.timings), MUPDF_LOCK:
+            pixmap = self.page.get_pixmap(matrix=self.matrix, clip=clip, colorspace=fitz.csRGB, alpha=False)
+            return pixmap_to_bgr(pixmap)
+
+
+def page_fingerprint(image: np.ndarray, text_layer: Optional[PdfTextLayer] = None) -> str:
+    """
+    Identity of one page as the pipeline sees it: the rendered pixels (so
+    any visible change counts, whatever the PDF structure) plus the text
+    layer words when those are used instead of OCR.
+    """
+    h = hashlib.sha256(f"{image.shape}|{image.dtype}".encode("utf-8"))
+    h.update(memoryview(np.ascontiguousarray(image)).cast("B"))
+    if text_layer is not None:
+        h.update(repr(text_layer.words).encode("utf-8"))
+    return h.hexdigest()
+
+
+def pixmap_to_bgr(pixmap) -> np.ndarray:
+    # View the pixmap buffer without copying; the RGB->BGR conversion is
+    # the only copy made.
+    rgb = np.frombuffer(pixmap.samples_mv, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+def ocr_region(cropped_image) -> str:
+    # Runs on the OCR pool, so only the histogram sees it (no per-request dict)
+    with span("ocr_region"):
+        pil_image = Image.fromarray(cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB))
+        text = pytesseract.image_to_string(pil_image, lang='eng')
+    return text.strip()
+
 
 def normalize_for_speech(tag: str, content: str) -> str:
         tag = tag.lower()
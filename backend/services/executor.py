@@ -0,0 +1,67 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator
+
+# ------------------------
+# Stage limits
+# ------------------------
+#
+# Every blocking call made from an ``async def`` route goes through one of
+# these stages instead of running on the event loop:
+#   etl  - document conversion, rendering, YOLO, OCR (CPU bound)
+#   io   - blocking network calls (YouTube, caption downloads)
+#   llm  - Gemini requests (the provider call only; the gateway awaits
+#          rate-limit tokens and 429 backoff on the event loop)
+#   tts  - speech synthesis
+#
+# Threads rather than processes: torch, OpenCV and MuPDF release the GIL
+# while they work and tesseract / LibreOffice run as subprocesses, so a
+# thread pool gives real parallelism without loading the YOLO checkpoint
+# once per worker process or pickling page images between processes.
+
+STAGE_LIMITS = {
+    "etl": int(os.getenv("ETL_CONCURRENCY", "2")),
+    "io": int(os.getenv("IO_CONCURRENCY", "16")),
+    "llm": int(os.getenv("LLM_CONCURRENCY", "8")),
+    "tts": int(os.getenv("TTS_CONCURRENCY", "8")),  # waits on tts_utils' worker processes
+}
+
+
+class Stage:
+    """A bounded thread pool for one kind of blocking work."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.pool = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"stage-{name}")
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, lambda: fn(*args, **kwargs))
+
+    async def iterate(self, iterator: Iterator) -> AsyncIterator:
+        """Drive a blocking generator from async code, one ``next()`` per pool task."""
+        sentinel = object()
+        try:
+            while True:
+                item = await self.run(next, iterator, sentinel)
+                if item is sentinel:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await self.run(close)
+
+
+stages = {name: Stage(name, limit) for name, limit in STAGE_LIMITS.items()}
+
+
+async def run_in_stage(stage: str, fn: Callable, *args, **kwargs):
+    return await stages[stage].run(fn, *args, **kwargs)
+
+
+def iterate_in_stage(stage: str, iterator: Iterator) -> AsyncIterator:
+    return stages[stage].iterate(iterator)
+
@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    dedup_key TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    params TEXT NOT NULL,
+    upload_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    page_count INTEGER,
+    timings TEXT NOT NULL DEFAULT '{}',
+    summary TEXT,
+    error TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key);
+CREATE TABLE IF NOT EXISTS job_pages (
+    job_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (job_id, page)
+);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# A manager refreshes ``updated_at`` on its queued / running jobs every
+# JOB_HEARTBEAT_SECONDS; jobs not refreshed for JOB_STALE_SECONDS belong to
+# a process that died and may be claimed by another one.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+
+class JobStore:
+    """SQLite persistence for document jobs and their per-page results."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _write(self, sql: str, args: tuple = ()) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(sql, args)
+
+    def create(self, job_id: str, dedup_key: str, filename: str, params: dict, upload_path: str, owner: str) -> None:
+        now = time.time()
+        self._write(
+            "INSERT INTO jobs (id, dedup_key, filename, params, upload_path, status, owner, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, dedup_key, filename, json.dumps(params), upload_path, QUEUED, owner, now, now)
+        )
+
+    def claim(self, job_id: str, owner: str, status: str, stale_before: float) -> bool:
+        """
+        Atomically take over an unfinished job: only succeeds when it is
+        unowned, already ours, or its owner's heartbeat is older than
+        ``stale_before``. Sets ``status`` on success.
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, updated_at = ? "
+                "WHERE id = ? AND status IN (?, ?) AND (owner IS NULL OR owner = ? OR updated_at < ?)",
+                (status, owner, time.time(), job_id, QUEUED, RUNNING, owner, stale_before)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, owner: str) -> None:
+        self._write(
+            "UPDATE jobs SET updated_at = ? WHERE owner = ? AND status IN (?, ?)",
+            (time.time(), owner, QUEUED, RUNNING)
+        )
+
+    def find_active(self, dedup_key: str) -> Optional[str]:
+        """Id of a queued, running or finished job for the same input, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status != ? ORDER BY created_at DESC LIMIT 1",
+                (dedup_key, FAILED)
+            ).fetchone()
+        return row["id"] if row else None
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        self._write(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id)
+        )
+
+    def set_page_count(self, job_id: str, page_count: int) -> None:
+        self._write("UPDATE jobs SET page_count = ?, updated_at = ? WHERE id = ?", (page_count, time.time(), job_id))
+
+    def add_page(self, job_id: str, page: int, content: list, timings: dict) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_pages (job_id, page, content) VALUES (?, ?, ?)",
+                (job_id, page, json.dumps(content))
+            )
+            conn.execute(
+                "UPDATE jobs SET timings = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(timings), time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, summary: dict, timings: dict) -> None:
+        self._write(
+            "UPDATE jobs SET status = ?, summary = ?, timings = ?, updated_at = ? WHERE id = ?",
+            (DONE, json.dumps(summary), json.dumps(timings), time.time(), job_id)
+        )
+
+    def reset(self, job_id: str) -> None:
+        """Drop partial results so an interrupted job can run again from the start."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM job_pages WHERE job_id = ?", (job_id,))
+            conn.execute(
+                "UPDATE jobs SET status = ?, timings = '{}', updated_at = ? WHERE id = ?",
+                (QUEUED, time.time(), job_id)
+            )
+
+    def orphaned(self, owner: str, stale_before: float) -> list:
+        """Unfinished jobs whose owner is gone: none recorded, or no heartbeat since ``stale_before``."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND owner IS NOT ? "
+                "AND (owner IS NULL OR updated_at < ?) ORDER BY created_at",
+                (QUEUED, RUNNING, owner, stale_before)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            pages = conn.execute(
+                "SELECT page, content FROM job_pages WHERE job_id = ? ORDER BY page",
+                (job_id,)
+            ).fetchall()
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["timings"] = json.loads(job["timings"])
+        job["summary"] = json.loads(job["summary"]) if job["summary"] else None
+        job["pages"] = [{"page": p["page"], "content": json.loads(p["content"])} for p in pages]
+        return job
+
+
+class JobManager:
+    """
+    Runs document jobs on a local worker pool.
+
+    ``process(job, timings)`` must return the same event stream as the
+    upload route (``start`` / ``page`` / ``summary`` events); every page is
+    persisted as it arrives so status polls see partial results.
+
+    Nothing happens on construction: ``start()`` (the app's startup hook)
+    opens the store, starts the workers and a heartbeat thread. Each
+    manager owns the jobs it queued and keeps them fresh; jobs whose owner
+    stopped heartbeating are claimed atomically by one surviving manager
+    and restarted, so several app processes can share one store.
+    """
+
+    def __init__(
+        self,
+        job_dir: str,
+        process: Callable[[dict, dict], Iterator[dict]],
+        workers: int = 1,
+        reusable: Optional[Callable[[dict], bool]] = None
+    ):
+        self.job_dir = job_dir
+        self.process = process
+        # Whether a finished job's results can still be served to a duplicate submission
+        self.reusable = reusable
+        self.workers = workers
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.store = None
+        self.pool = None
+        self._submit_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread = None
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self.store is not None:
+                return
+            os.makedirs(self.job_dir, exist_ok=True)
+            self.store = JobStore(os.path.join(self.job_dir, "jobs.db"))
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._stop.clear()
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+            self._heartbeat_thread.start()
+
+    def start(self) -> None:
+        """Open the store, start workers and resume orphaned jobs (idempotent)."""
+        self._ensure_started()
+        self._recover()
+
+    def stop(self) -> None:
+        """Stop taking work; unstarted jobs stay queued for the next process to claim."""
+        self._stop.set()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, upload_path: str, dedup_key: str, filename: str, params: dict) -> tuple:
+        """
+        Queue a job for ``upload_path`` (which is moved into the job folder).
+        Returns ``(job_id, deduplicated)``; identical submissions share a
+        job, unless it is done and ``reusable`` says its outputs are gone.
+        """
+        self._ensure_started()
+        with self._submit_lock:
+            existing = self.store.find_active(dedup_key)
+            if existing is not None and self.reusable is not None:
+                job = self.store.get(existing)
+                if job["status"] == DONE and not self.reusable(job):
+                    existing = None
+            if existing is not None:
+                os.remove(upload_path)
+                return existing, True
+
+            job_id = uuid.uuid4().hex
+            stored_path = os.path.join(self.job_dir, job_id + os.path.splitext(filename)[1])
+            shutil.move(upload_path, stored_path)
+            self.store.create(job_id, dedup_key, filename, params, stored_path, self.owner)
+        self.pool.submit(self._run, job_id)
+        return job_id, False
+
+    def status(self, job_id: str) -> Optional[dict]:
+        self._ensure_started()
+        return self.store.get(job_id)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.store.heartbeat(self.owner)
+                # Pick up jobs of processes that died since startup
+                self._recover()
+            except Exception:
+                logger.exception("❌ Job heartbeat failed")
+
+    def _recover(self) -> None:
+        stale_before = time.time() - JOB_STALE_SECONDS
+        for job in self.store.orphaned(self.owner, stale_before):
+            # Another process may be recovering the same job; only one claim wins
+            if not self.store.claim(job["id"], self.owner, QUEUED, stale_before):
+                continue
+            if not os.path.exists(job["upload_path"]):
+                self.store.set_status(job["id"], FAILED, "Upload lost before the job could be restarted")
+                continue
+            logger.info("♻️ Restarting job %s", job["id"])
+            self.store.reset(job["id"])
+            self.pool.submit(self._run, job["id"])
+
+    def _run(self, job_id: str) -> None:
+        if self._stop.is_set():
+            return
+        if not self.store.claim(job_id, self.owner, RUNNING, time.time() - JOB_STALE_SECONDS):
+            logger.info("Job %s was taken over by another process", job_id)
+            return
+        job = self.store.get(job_id)
+        timings = {}
+        try:
+            for event in self.process(job, timings):
+                kind = event.pop("event")
+                if kind == "start":
+                    self.store.set_page_count(job_id, event["page_count"])
+                elif kind == "page":
+                    self.store.add_page(job_id, event["page"], event["content"], timings)
+                elif kind == "summary":
+                    self.store.finish(job_id, event, timings)
+        except Exception as e:
+            logger.exception("❌ Job failed: %s", job_id)
+            self.store.set_status(job_id, FAILED, str(e))
@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from services.executor import run_in_stage
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+
+LLM_RPM = float(os.getenv("LLM_RPM", "15"))          # shared by every route
+LLM_BURST = int(os.getenv("LLM_BURST", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+# Point at a local fake server (see benchmarks/fake_llm_server.py) instead of Gemini
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+
+
+class RateLimited(Exception):
+    """The provider answered 429 / quota exhausted."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate_per_minute`` sustained, ``capacity`` burst."""
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class TTLCache:
+    """Size-bounded LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class GeminiBackend:
+    """One configured client and one ``GenerativeModel`` per (model, safety) pair, reused by every call."""
+
+    def __init__(self, api_key: Optional[str]):
+        self.available = bool(api_key)
+        self._models = {}
+        self._lock = threading.Lock()
+        if self.available:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+        else:
+            logger.warning("❗ GEMINI_API_KEY missing in .env")
+
+    def _model(self, model: str, safety: Optional[str]):
+        with self._lock:
+            key = (model, safety)
+            if key not in self._models:
+                import google.generativeai as genai
+                from google.generativeai.types import HarmCategory, HarmBlockThreshold
+                safety_settings = None
+                if safety == "none":
+                    safety_settings = {
+                        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+                        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+                        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+                        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+                    }
+                self._models[key] = genai.GenerativeModel(model, safety_settings=safety_settings)
+            return self._models[key]
+
+    def generate(self, prompt: str, model: str, safety: Optional[str]) -> str:
+        try:
+            return self._model(model, safety).generate_content(prompt).text
+        except Exception as e:
+            error_str = str(e)
+            if "429" in error_str or "quota" in error_str.lower() or type(e).__name__ == "ResourceExhausted":
+                raise RateLimited(error_str) from e
+            raise
+
+
+class HTTPBackend:
+    """
+    Plain JSON-over-HTTP backend for local fakes:
+    ``POST {base_url}/generate {"model", "prompt"} -> {"text"}``, 429 when throttled.
+    """
+
+    def __init__(self, base_url: str):
+        import requests
+        self.available = True
+        self.base_url = base_url.rstrip("/")
+        # Keep-alive connection pool shared by all calls
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, prompt: str, model: str, safety: Optional[str]) -> str:
+        response = self.session.post(
+            f"{self.base_url}/generate",
+            json={"model": model, "prompt": prompt, "safety": safety},
+            timeout=120
+        )
+        if response.status_code == 429:
+            raise RateLimited(response.text)
+        response.raise_for_status()
+        return response.json()["text"]
+
+
+class LLMGateway:
+    """
+    Single entry point for every LLM call in the backend.
+
+    Calls share one rate limiter, retry 429s with full-jitter exponential
+    backoff, are answered from an exact-prompt TTL cache when possible,
+    and identical prompts already in flight are coalesced so only one
+    request reaches the provider.
+    """
+
+    def __init__(self, backend, rpm: float, burst: int, max_retries: int, cache_size: int, cache_ttl: float):
+        self.backend = backend
+        self.limiter = TokenBucket(rpm, burst)
+        self.max_retries = max_retries
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        backend = HTTPBackend(LLM_BASE_URL) if LLM_BASE_URL else GeminiBackend(os.getenv("GEMINI_API_KEY"))
+        return cls(backend, LLM_RPM, LLM_BURST, LLM_MAX_RETRIES, LLM_CACHE_SIZE, LLM_CACHE_TTL)
+
+    @property
+    def available(self) -> bool:
+        return self.backend.available
+
+    def _claim(self, key: str, cache: bool) -> tuple:
+        """
+        ``(cached_text, pending, owner)``: a cached answer, or the in-flight
+        future for ``key`` and whether this caller owns (must fulfil) it.
+        """
+        if cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return cached, None, False
+
+        with self._in_flight_lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                # The previous owner may have finished since the cache check
+                cached = self.cache.get(key) if cache else None
+                if cached is not None:
+                    return cached, None, False
+                pending = Future()
+                self._in_flight[key] = pending
+        if not owner:
+            self.stats["coalesced"] += 1
+        return None, pending, owner
+
+    def _settle(self, key: str, pending: Future, cache: bool, text: Optional[str] = None, error: Optional[BaseException] = None) -> None:
+        if error is None:
+            if cache:
+                self.cache.put(key, text)
+            pending.set_result(text)
+        else:
+            pending.set_exception(error)
+        with self._in_flight_lock:
+            self._in_flight.pop(key, None)
+
+    def generate(self, prompt: str, model: str = "gemini-2.0-flash", safety: Optional[str] = None, cache: bool = True) -> str:
+        """Blocking call; use ``agenerate`` from async routes."""
+        if not self.available:
+            raise RuntimeError("LLM not configured (GEMINI_API_KEY missing)")
+
+        key = hashlib.sha256(f"{model}|{safety}|{prompt}".encode("utf-8")).hexdigest()
+        cached, pending, owner = self._claim(key, cache)
+        if cached is not None:
+            return cached
+        if not owner:
+            return pending.result()
+
+        try:
+            text = self._call_with_retry(prompt, model, safety)
+        except BaseException as e:
+            self._settle(key, pending, cache, error=e)
+            raise
+        self._settle(key, pending, cache, text)
+        return text
+
+    async def agenerate(self, prompt: str, model: str = "gemini-2.0-flash", safety: Optional[str] = None, cache: bool = True) -> str:
+        """
+        Async variant of ``generate``. Rate-limit tokens and 429 backoff are
+        awaited on the event loop, so a throttled caller (e.g. a long
+        caption punctuation run) never parks an "llm" stage thread; only
+        the provider request itself runs in the stage.
+        """
+        if not self.available:
+            raise RuntimeError("LLM not configured (GEMINI_API_KEY missing)")
+
+        key = hashlib.sha256(f"{model}|{safety}|{prompt}".encode("utf-8")).hexdigest()
+        cached, pending, owner = self._claim(key, cache)
+        if cached is not None:
+            return cached
+        if not owner:
+            return await asyncio.wrap_future(pending)
+
+        # The provider call runs as its own task and settles the shared
+        # future with its real outcome. Cancelling this caller (a streaming
+        # client that went away) must not fail everyone coalesced on it.
+        call = asyncio.ensure_future(self._acall_with_retry(prompt, model, safety))
+        call.add_done_callback(lambda task: self._settle_task(key, pending, cache, task))
+        return await asyncio.shield(call)
+
+    def _settle_task(self, key: str, pending: Future, cache: bool, task: asyncio.Task) -> None:
+        if task.cancelled():
+            # Only when the loop itself shuts down
+            self._settle(key, pending, cache, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._settle(key, pending, cache, error=task.exception())
+        else:
+            self._settle(key, pending, cache, task.result())
+
+    def _call_backend(self, prompt: str, model: str, safety: Optional[str]) -> str:
+        self.stats["requests"] += 1
+        try:
+            return self.backend.generate(prompt, model, safety)
+        except RateLimited:
+            raise
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+
+    def _backoff(self, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a 429, or ``None`` once retries are exhausted."""
+        if attempt == self.max_retries:
+            self.stats["failures"] += 1
+            return None
+        self.stats["retries"] += 1
+        wait = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+        logger.warning("429 from provider, retrying in %.1fs", wait)
+        return wait
+
+    def _call_with_retry(self, prompt: str, model: str, safety: Optional[str]) -> str:
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                return self._call_backend(prompt, model, safety)
+            except RateLimited:
+                wait = self._backoff(attempt)
+                if wait is None:
+                    raise
+                time.sleep(wait)
+
+    async def _acall_with_retry(self, prompt: str, model: str, safety: Optional[str]) -> str:
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async()
+            try:
+                return await run_in_stage("llm", self._call_backend, prompt, model, safety)
+            except RateLimited:
+                wait = self._backoff(attempt)
+                if wait is None:
+                    raise
+                await asyncio.sleep(wait)
+
+
+llm_gateway = LLMGateway.from_env()
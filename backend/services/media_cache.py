@@ -0,0 +1,44 @@
+import os
+import re
+from typing import Optional
+
+from services.disk_cache import DiskCache
+from services.storage import DATA_DIR
+
+# ------------------------
+# Config
+# ------------------------
+
+MEDIA_CACHE_DIR = os.path.join(DATA_DIR, "media_cache")
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_MB", "256")) * 1024 * 1024
+MEDIA_CACHE_TTL = float(os.getenv("MEDIA_CACHE_TTL_HOURS", "168")) * 3600
+
+# One cache for everything derived from a YouTube video:
+#   captions            raw caption events + grouped, timed paragraphs
+#   punctuated-<model>  punctuated paragraphs + a digest of the raw texts they came from
+#   transcript          transcript / description text for analyze_structure
+media_cache = DiskCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, ttl_seconds=MEDIA_CACHE_TTL)
+
+
+def extract_video_id(url: str):
+    regex = r"(?:youtu\.be\/|v\/|u\/\w\/|embed\/|watch\?v=|&v=)([^#&?]*).*"
+    match = re.search(regex, url)
+    if match and len(match.group(1)) == 11:
+        return match.group(1)
+    return None
+
+
+def media_key(kind: str, video_id: str, lang: str = "en") -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{kind}-{lang}-{video_id}")
+
+
+def get_media(kind: str, video_id: Optional[str], lang: str = "en") -> Optional[dict]:
+    if not video_id:
+        return None
+    return media_cache.get(media_key(kind, video_id, lang))
+
+
+def put_media(kind: str, video_id: Optional[str], payload: dict, lang: str = "en") -> dict:
+    if video_id:
+        media_cache.put(media_key(kind, video_id, lang), payload)
+    return payload
@@ -0,0 +1,159 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+# ------------------------
+# Minimal Prometheus-style metrics (text exposition format 0.0.4)
+# ------------------------
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a single OCR'd box up to a whole LibreOffice conversion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []  # (prefix, help, callback returning a (nested) dict of numbers)
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_gauges(self, prefix: str, help: str, collect: Callable[[], dict]) -> None:
+        """Expose every number in ``collect()`` as ``<prefix>_<key>`` gauges, read at scrape time."""
+        with self._lock:
+            self._gauges.append((prefix, help, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, gauges = list(self._metrics), list(self._gauges)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for prefix, help, collect in gauges:
+            try:
+                values = _flatten(prefix, collect())
+            except Exception:
+                continue
+            for name, value in values:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(prefix: str, values: dict) -> list:
+    flat = []
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            flat.extend(_flatten(name, value))
+        elif isinstance(value, bool):
+            flat.append((name, int(value)))
+        elif isinstance(value, (int, float)):
+            flat.append((name, value))
+    return flat
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "etl_stage_seconds",
+    "Seconds spent per document pipeline stage (one observation per span).",
+    labelnames=("stage",)
+))
+DOCUMENTS = registry.register(Counter(
+    "etl_documents_total",
+    "Documents processed, by result cache outcome.",
+    labelnames=("cache",)
+))
+PAGES = registry.register(Counter("etl_pages_total", "Pages returned by the document pipeline."))
+
+
+def add_timing(timings: Optional[Dict[str, float]], stage: str, seconds: float) -> None:
+    """Record one ``stage`` span: always into the histogram, and into the per-request ``timings`` dict if given."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds, 3)
+
+
+@contextmanager
+def span(stage: str, timings: Optional[Dict[str, float]] = None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(timings, stage, time.perf_counter() - start)
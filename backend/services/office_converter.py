@@ -0,0 +1,294 @@
+import collections
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from services.storage import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+
+OFFICE_BINARY = os.getenv("OFFICE_BINARY", "libreoffice")
+OFFICE_WORKERS = int(os.getenv("OFFICE_WORKERS", "2"))
+OFFICE_TIMEOUT = float(os.getenv("OFFICE_TIMEOUT", "120"))             # per conversion
+OFFICE_START_TIMEOUT = float(os.getenv("OFFICE_START_TIMEOUT", "30"))
+OFFICE_MAX_JOBS = int(os.getenv("OFFICE_MAX_JOBS", "200"))             # recycle after this many (soffice leaks)
+OFFICE_PROFILE_DIR = os.getenv("OFFICE_PROFILE_DIR", os.path.join(DATA_DIR, "office_profiles"))
+
+OFFICE_EXTENSIONS = ['.docx', '.doc', '.pptx', '.ppt', '.xlsx', '.xls']
+
+# storeToURL needs the export filter matching the document family
+PDF_FILTERS = {
+    ".doc": "writer_pdf_Export",
+    ".docx": "writer_pdf_Export",
+    ".ppt": "impress_pdf_Export",
+    ".pptx": "impress_pdf_Export",
+    ".xls": "calc_pdf_Export",
+    ".xlsx": "calc_pdf_Export",
+}
+
+
+def _output_pdf(input_path: str, work_dir: str) -> str:
+    return os.path.join(work_dir, os.path.splitext(os.path.basename(input_path))[0] + ".pdf")
+
+
+def _profile_url(profile_dir: str) -> str:
+    return "file://" + os.path.abspath(profile_dir)
+
+
+def cold_convert(input_path: str, work_dir: str, timeout: float = OFFICE_TIMEOUT) -> str:
+    """
+    One-shot ``--convert-to`` in a fresh soffice process. Each call gets its
+    own throwaway user profile, so concurrent conversions don't fight over
+    the profile lock.
+    """
+    profile_dir = tempfile.mkdtemp(prefix="lo-profile-")
+    try:
+        subprocess.run([
+            OFFICE_BINARY, "--headless", "--norestore", "--nologo",
+            f"-env:UserInstallation={_profile_url(profile_dir)}",
+            "--convert-to", "pdf", "--outdir", work_dir, input_path,
+        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+    output_path = _output_pdf(input_path, work_dir)
+    if not os.path.exists(output_path):
+        raise RuntimeError("LibreOffice failed to create the intermediate PDF.")
+    return output_path
+
+
+class _Instance:
+    """One long-lived headless soffice with its own profile, driven over a UNO pipe."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.profile_dir = os.path.join(OFFICE_PROFILE_DIR, f"instance_{index}")
+        self.process = None
+        self.desktop = None
+        self.jobs = 0
+        # UNO calls block; running them on a private thread lets convert() time out
+        self.caller = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"office-{index}")
+
+    def start(self) -> None:
+        import uno
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        pipe_name = f"lo_pool_{os.getpid()}_{self.index}_{uuid.uuid4().hex[:8]}"
+        self.process = subprocess.Popen([
+            OFFICE_BINARY, "--headless", "--invisible", "--norestore", "--nologo", "--nodefault",
+            f"-env:UserInstallation={_profile_url(self.profile_dir)}",
+            f"--accept=pipe,name={pipe_name};urp;StarOffice.ComponentContext",
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + OFFICE_START_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"LibreOffice instance {self.index} failed to start")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        self.jobs = 0
+        logger.info("📄 LibreOffice instance %d ready (pid %d)", self.index, self.process.pid)
+
+    def stop(self) -> None:
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def restart(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            # Killing first unblocks any UNO call stuck on this instance
+            self.process.kill()
+        self.desktop = None
+        self.stop()
+        self.start()
+
+    def healthy(self) -> bool:
+        if self.process is None or self.process.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def _convert(self, input_path: str, output_path: str) -> None:
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name, p.Value = name, value
+            return p
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+            (prop("Hidden", True), prop("ReadOnly", True)),
+        )
+        if document is None:
+            raise RuntimeError("LibreOffice could not open the document")
+        try:
+            filter_name = PDF_FILTERS[os.path.splitext(input_path)[1].lower()]
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                (prop("FilterName", filter_name),),
+            )
+        finally:
+            document.close(True)
+
+    def convert(self, input_path: str, output_path: str, timeout: float) -> None:
+        if not self.healthy() or self.jobs >= OFFICE_MAX_JOBS:
+            self.restart()
+        future = self.caller.submit(self._convert, input_path, output_path)
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeout:
+            # The instance is wedged on this document; replace it. If the
+            # replacement won't start, leave it stopped (healthy() is then
+            # False, so the next convert() retries the restart) and still
+            # report the timeout, not the restart failure.
+            try:
+                self.restart()
+            except Exception:
+                logger.exception("⚠️ LibreOffice instance %d failed to restart after a timeout", self.index)
+                self.desktop = None
+            raise TimeoutError(f"LibreOffice conversion did not finish within {timeout}s")
+        finally:
+            self.jobs += 1
+
+
+class OfficeConverterPool:
+    """
+    Fixed set of warm headless LibreOffice instances, each with its own user
+    profile. Conversions wait for an idle instance; unhealthy instances are
+    restarted before use, and one that times out is killed and replaced.
+    Instances start on first use.
+
+    Driving soffice needs the ``uno`` module (LibreOffice's Python bridge);
+    without it every conversion falls back to ``cold_convert``.
+    """
+
+    def __init__(self, workers: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._stats_lock = threading.Lock()
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._timeouts = 0
+        self._cold = 0
+        self._latencies = collections.deque(maxlen=200)
+        try:
+            import uno  # noqa: F401
+            self.available = workers > 0
+        except ImportError:
+            self.available = False
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._started:
+                return
+            for index in range(self.workers):
+                instance = _Instance(index)
+                try:
+                    instance.start()
+                except Exception as e:
+                    # Leave it stopped; convert() restarts it when it comes up for work
+                    logger.warning("⚠️ LibreOffice instance %d not started: %s", index, e)
+                self._idle.put(instance)
+            self._started = True
+
+    def convert(self, input_path: str, work_dir: str, timeout: Optional[float] = None) -> str:
+        """Convert an Office document to ``work_dir/<name>.pdf`` and return its path."""
+        start = time.perf_counter()
+        if not self.available:
+            try:
+                return cold_convert(input_path, work_dir, timeout or self.timeout)
+            finally:
+                with self._stats_lock:
+                    self._cold += 1
+                    self._latencies.append(time.perf_counter() - start)
+
+        self._ensure_started()
+        output_path = _output_pdf(input_path, work_dir)
+        with self._stats_lock:
+            self._waiting += 1
+        instance = self._idle.get()
+        with self._stats_lock:
+            self._waiting -= 1
+        try:
+            instance.convert(input_path, output_path, timeout or self.timeout)
+            if not os.path.exists(output_path):
+                raise RuntimeError("LibreOffice failed to create the intermediate PDF.")
+            with self._stats_lock:
+                self._completed += 1
+            return output_path
+        except TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        except Exception:
+            with self._stats_lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self._latencies.append(time.perf_counter() - start)
+            self._idle.put(instance)
+
+    def shutdown(self) -> None:
+        with self._start_lock:
+            while not self._idle.empty():
+                self._idle.get().stop()
+            self._started = False
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            return {
+                "workers": self.workers if self.available else 0,
+                "warm": self.available,
+                "queue_depth": self._waiting,
+                "completed": self._completed,
+                "failed": self._failed,
+                "timeouts": self._timeouts,
+                "cold_spawns": self._cold,
+                "latency_seconds": {
+                    "samples": len(latencies),
+                    "p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "max": round(latencies[-1], 3) if latencies else None,
+                },
+            }
+
+
+office_pool = OfficeConverterPool(OFFICE_WORKERS, OFFICE_TIMEOUT)
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import shutil
+from typing import List, Optional
+
+from services.disk_cache import DiskCache
+
+
+def checkpoint_fingerprint(model_path: str) -> str:
+    """Cheap identity for a model checkpoint: path, size and mtime."""
+    try:
+        st = os.stat(model_path)
+        return f"{os.path.abspath(model_path)}:{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        return os.path.abspath(model_path)
+
+
+def make_result_key(content_sha256: str, **params) -> str:
+    """Cache key for one processed document: upload digest plus every setting that changes the output."""
+    h = hashlib.sha256(content_sha256.encode("utf-8"))
+    for name in sorted(params):
+        h.update(f"|{name}={params[name]}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of ``parse_image_layout`` output per document.
+
+    Crops referenced by the parsed pages (Picture / Table / Formula) are copied
+    into the cache entry and the page content is rewritten to point at the
+    cached copies, so a hit never depends on ``parsed_sections`` still
+    holding the original files.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, visual_labels: List[str]):
+        self.store = DiskCache(cache_dir, max_bytes)
+        self.visual_labels = visual_labels
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        return entry["pages"]
+
+    def put(self, key: str, pages: List[dict]) -> List[dict]:
+        entry_dir = self.store.entry_dir(key)
+        files = {}
+        cached_pages = [
+            {**page, "content": _cache_crops(page["content"], entry_dir, f"page_{page['page']}", self.visual_labels, files)}
+            for page in pages
+        ]
+        self.store.put(key, {"pages": cached_pages}, files)
+        return cached_pages
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+class PageCache:
+    """
+    Cache of one page's parsed content by page fingerprint (see
+    ``etl_service.page_fingerprint``), so a revised document only has its
+    changed pages detected and OCR'd. Crops are copied in like
+    ``ResultCache`` does.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, visual_labels: List[str]):
+        self.store = DiskCache(cache_dir, max_bytes)
+        self.visual_labels = visual_labels
+
+    def scoped(self, **params) -> "ScopedPageCache":
+        """View for one request's settings (DPI, model, text source...), which are part of every key."""
+        return ScopedPageCache(self, params)
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+class ScopedPageCache:
+    def __init__(self, cache: PageCache, params: dict):
+        self.cache = cache
+        self.params = params
+        self.reused = 0
+
+    def _key(self, fingerprint: str) -> str:
+        return make_result_key(fingerprint, **self.params)
+
+    def get(self, fingerprint: str) -> Optional[List[dict]]:
+        entry = self.cache.store.get(self._key(fingerprint))
+        if entry is None:
+            return None
+        self.reused += 1
+        return entry["content"]
+
+    def put(self, fingerprint: str, content: List[dict]) -> List[dict]:
+        key = self._key(fingerprint)
+        files = {}
+        cached_content = _cache_crops(content, self.cache.store.entry_dir(key), "", self.cache.visual_labels, files)
+        self.cache.store.put(key, {"content": cached_content}, files)
+        return cached_content
+
+
+def _cache_crops(content: List[dict], entry_dir: str, subdir: str, visual_labels: List[str], files: dict) -> List[dict]:
+    """Point crop items at their copy inside ``entry_dir``, recording the copies to make in ``files``."""
+    cached_content = []
+    for item in content:
+        path = item["content"]
+        if item["tag"] in visual_labels and path and os.path.isfile(path):
+            rel_path = os.path.join(subdir, os.path.basename(path))
+            files[rel_path] = path
+            path = os.path.join(entry_dir, rel_path)
+        cached_content.append({**item, "content": path})
+    return cached_content
+
+
+def export_crops(content: List[dict], dest_dir: str, visual_labels: List[str]) -> List[dict]:
+    """
+    Point crop items at hard links (copies across filesystems) inside
+    ``dest_dir``, so what clients fetch lives in their own output namespace
+    rather than in a cache entry that LRU eviction may delete. Crops
+    already there (same file name) are reused.
+    """
+    exported = []
+    for item in content:
+        path = item["content"]
+        if item["tag"] in visual_labels and path and os.path.isfile(path):
+            dest = os.path.join(dest_dir, os.path.basename(path))
+            if not os.path.exists(dest):
+                os.makedirs(dest_dir, exist_ok=True)
+                try:
+                    os.link(path, dest)
+                except OSError:
+                    shutil.copy2(path, dest)
+            path = dest
+        exported.append({**item, "content": path})
+    return exported
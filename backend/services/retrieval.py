@@ -0,0 +1,169 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Optional, Union
+
+CHUNK_MAX_CHARS = 800
+HISTORY_MAX_CHARS = 1500
+SECTION_TAGS = {"title", "section-header"}
+NON_TEXT_TAGS = {"picture", "table", "formula"}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (words plus punctuation marks), good enough to compare prompts."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def chunks_from_pages(pages: List[dict]) -> List[dict]:
+    """
+    Group ``parse_image_layout`` output into retrieval chunks.
+
+    A chunk starts at every Title / Section-header and is cut when it grows
+    past ``CHUNK_MAX_CHARS``, so headings stay attached to their text.
+    Visual regions (crop paths) carry no text and are skipped.
+    """
+    chunks = []
+    current = None
+
+    def flush():
+        if current and current["text"].strip():
+            chunks.append(current)
+
+    for page in pages:
+        for item in page["content"]:
+            tag = item["tag"]
+            text = (item.get("content") or "").strip()
+            if tag.lower() in NON_TEXT_TAGS or not text:
+                continue
+            starts_section = tag.lower() in SECTION_TAGS
+            if current is None or starts_section or len(current["text"]) + len(text) > CHUNK_MAX_CHARS:
+                flush()
+                current = {"page": page["page"], "order": len(chunks), "tags": [], "text": ""}
+            current["tags"].append(tag)
+            current["text"] = (current["text"] + "\n" + text).strip()
+    flush()
+    for order, chunk in enumerate(chunks):
+        chunk["order"] = order
+    return chunks
+
+
+def chunks_from_text(content: str) -> List[dict]:
+    """Fallback for plain-text documents: paragraphs packed up to ``CHUNK_MAX_CHARS``."""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", content or "") if p.strip()]
+    pages = [{"page": None, "content": [{"tag": "Text", "content": p} for p in paragraphs]}]
+    return chunks_from_pages(pages)
+
+
+class BM25Index:
+    """Okapi BM25 over a document's chunks."""
+
+    def __init__(self, chunks: List[dict], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(c["text"])) for c in chunks]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def search(self, query: str, top_k: int = 4) -> List[dict]:
+        """Best ``top_k`` chunks for ``query``, returned in reading order."""
+        terms = [t for t in tokenize(query) if t in self.idf]
+        scored = []
+        for i, tf in enumerate(self.term_freqs):
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if not freq:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+                score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(reverse=True)
+        best = sorted(i for _, i in scored[:top_k])
+        if not best:
+            # Nothing matched (e.g. "summarise this"): fall back to the opening chunks
+            best = list(range(min(top_k, len(self.chunks))))
+        return [self.chunks[i] for i in best]
+
+
+class IndexCache:
+    """Small in-memory LRU of BM25 indexes by document id."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, document_id: str) -> Optional[BM25Index]:
+        with self._lock:
+            index = self._indexes.get(document_id)
+            if index is not None:
+                self._indexes.move_to_end(document_id)
+            return index
+
+    def get_or_build(self, document_id: str, pages: List[dict]) -> BM25Index:
+        index = self.get(document_id)
+        if index is not None:
+            return index
+        index = BM25Index(chunks_from_pages(pages))
+        with self._lock:
+            self._indexes[document_id] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+
+def format_sections(chunks: List[dict]) -> str:
+    parts = []
+    for chunk in chunks:
+        where = f"Page {chunk['page']}" if chunk["page"] is not None else "Section"
+        parts.append(f"[{where} | {', '.join(dict.fromkeys(chunk['tags']))}]\n{chunk['text']}")
+    return "\n\n".join(parts)
+
+
+def window_history(history: Optional[Union[str, list]], max_chars: int = HISTORY_MAX_CHARS) -> str:
+    """Keep only the most recent conversation, up to ``max_chars`` characters."""
+    if not history:
+        return ""
+    if isinstance(history, list):
+        lines = []
+        for turn in history:
+            if isinstance(turn, dict):
+                lines.append(f"{turn.get('role', 'user')}: {turn.get('content', '')}")
+            else:
+                lines.append(str(turn))
+        history = "\n".join(lines)
+    if len(history) <= max_chars:
+        return history
+    trimmed = history[-max_chars:]
+    # Do not start mid-line
+    newline = trimmed.find("\n")
+    return trimmed[newline + 1:] if 0 <= newline < len(trimmed) - 1 else trimmed
+
+
+def build_chat_prompt(document: str, history: str, question: str) -> str:
+    return f"""
+You are an accessibility assistant for visually impaired users.
+
+Document content:
+{document}
+
+Conversation history:
+{history}
+
+User question:
+{question}
+"""
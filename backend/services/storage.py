@@ -0,0 +1,259 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+
+# Roots for everything the backend writes: OUT_DIR is served under /out,
+# DATA_DIR (job state, media cache, office profiles) never is. Every
+# other path is derived from these, so one env var relocates a whole tree.
+OUT_DIR = os.getenv("OUT_DIR", "out")
+DATA_DIR = os.getenv("DATA_DIR", "data")
+VISUAL_OUT_DIR = os.path.join(OUT_DIR, "visual")
+JOB_OUTPUT_DIR = os.path.join(VISUAL_OUT_DIR, "jobs")
+# Everything under these folders is disposable output. Each direct child
+# (a job namespace, an audio track, a legacy page folder) is one entry.
+MANAGED_DIRS = [
+    JOB_OUTPUT_DIR,
+    os.path.join(VISUAL_OUT_DIR, "audio"),
+    os.path.join(VISUAL_OUT_DIR, "converted_images"),
+    os.path.join(VISUAL_OUT_DIR, "parsed_sections"),
+]
+# Bounded by their own DiskCache, never touched here
+UNMANAGED_NAMES = {"segments"}
+# Per-root folder of empty marker files whose mtimes record last access.
+# Served files keep their own mtime, which the /out ETag is built from.
+ACCESS_DIR_NAME = ".access"
+
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_MB", "2048")) * 1024 * 1024
+OUTPUT_TTL = float(os.getenv("OUTPUT_TTL_HOURS", "24")) * 3600
+OUTPUT_GC_INTERVAL = float(os.getenv("OUTPUT_GC_INTERVAL_SECONDS", "300"))
+
+
+def _size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class OutputStore:
+    """
+    Lifecycle manager for generated files under ``out/``.
+
+    Each upload writes into its own namespace folder, so names derived from
+    the original filename can't collide across users. An entry's last
+    access is the mtime of its marker in ``<root>/.access`` (falling back to
+    the entry's own mtime): it is bumped on creation and whenever a file
+    inside it is served. ``gc()`` deletes entries not accessed within
+    ``ttl_seconds``, then the least recently accessed ones until everything
+    fits in ``max_bytes``. Entries marked in use (a job still writing) are
+    never collected.
+    """
+
+    def __init__(self, roots: List[str], max_bytes: int, ttl_seconds: float):
+        self.roots = roots
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._in_use = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"runs": 0, "expired": 0, "evicted": 0, "bytes_freed": 0, "bytes_used": 0, "entries": 0}
+        for root in self.roots:
+            os.makedirs(os.path.join(root, ACCESS_DIR_NAME), exist_ok=True)
+
+    # -------- namespaces --------
+
+    def namespace(self, name: Optional[str] = None) -> str:
+        """Create (or reuse) a per-job output folder under ``JOB_OUTPUT_DIR``."""
+        path = os.path.join(self.roots[0], name or uuid.uuid4().hex)
+        os.makedirs(path, exist_ok=True)
+        self.touch(path)
+        return path
+
+    @contextmanager
+    def in_use(self, path: str):
+        """Protect ``path`` from GC while a job is writing to it."""
+        entry = os.path.abspath(path)
+        with self._lock:
+            self._in_use[entry] = self._in_use.get(entry, 0) + 1
+        try:
+            yield path
+        finally:
+            with self._lock:
+                self._in_use[entry] -= 1
+                if not self._in_use[entry]:
+                    del self._in_use[entry]
+            self.touch(path)
+
+    def _entry_for(self, path: str) -> Optional[str]:
+        """The managed entry (direct child of a root) containing ``path``."""
+        path = os.path.abspath(path)
+        for root in self.roots:
+            root = os.path.abspath(root)
+            if path.startswith(root + os.sep):
+                name = os.path.relpath(path, root).split(os.sep, 1)[0]
+                if name not in UNMANAGED_NAMES and name != ACCESS_DIR_NAME:
+                    return os.path.join(root, name)
+        return None
+
+    @staticmethod
+    def _marker(entry: str) -> str:
+        root, name = os.path.split(entry)
+        return os.path.join(root, ACCESS_DIR_NAME, name)
+
+    def touch(self, path: str) -> None:
+        """Record an access to ``path`` (or the entry holding it) without changing its own timestamps."""
+        entry = self._entry_for(path)
+        if entry is None:
+            return
+        marker = self._marker(entry)
+        try:
+            os.utime(marker)
+        except FileNotFoundError:
+            try:
+                os.makedirs(os.path.dirname(marker), exist_ok=True)
+                open(marker, "a").close()
+            except OSError:
+                pass
+        except OSError:
+            pass
+
+    def _accessed_at(self, path: str) -> float:
+        try:
+            return os.path.getmtime(self._marker(path))
+        except OSError:
+            return os.path.getmtime(path)
+
+    # -------- garbage collection --------
+
+    def _entries(self) -> Iterable[Tuple[str, float]]:
+        for root in self.roots:
+            try:
+                names = os.listdir(root)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                # In-progress writes (".part", ".tmp-") and the access markers are left alone
+                if name in UNMANAGED_NAMES or name.endswith(".part") or name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    yield path, self._accessed_at(path)
+                except OSError:
+                    continue
+
+    def _remove(self, path: str) -> int:
+        size = _size(path)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                return 0
+        try:
+            os.remove(self._marker(path))
+        except OSError:
+            pass
+        return size
+
+    def _prune_markers(self) -> None:
+        """Drop access markers whose entry is gone (removed elsewhere, e.g. by hand)."""
+        for root in self.roots:
+            marker_dir = os.path.join(root, ACCESS_DIR_NAME)
+            try:
+                names = os.listdir(marker_dir)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if not os.path.exists(os.path.join(root, name)):
+                    try:
+                        os.remove(os.path.join(marker_dir, name))
+                    except OSError:
+                        pass
+
+    def gc(self) -> dict:
+        """One collection pass; returns what it removed."""
+        now = time.time()
+        with self._lock:
+            in_use = set(self._in_use)
+        expired = evicted = freed = 0
+        live = []
+        for path, accessed_at in self._entries():
+            if os.path.abspath(path) in in_use:
+                live.append((accessed_at, path, _size(path), True))
+            elif self.ttl_seconds and now - accessed_at > self.ttl_seconds:
+                freed += self._remove(path)
+                expired += 1
+            else:
+                live.append((accessed_at, path, _size(path), False))
+
+        self._prune_markers()
+
+        total = sum(size for _, _, size, _ in live)
+        for accessed_at, path, size, busy in sorted(live):
+            if total <= self.max_bytes:
+                break
+            if busy:
+                continue
+            freed += self._remove(path)
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self.stats["runs"] += 1
+            self.stats["expired"] += expired
+            self.stats["evicted"] += evicted
+            self.stats["bytes_freed"] += freed
+            self.stats["bytes_used"] = total
+            self.stats["entries"] = len(live) - evicted
+        if expired or evicted:
+            logger.info("🧹 Output GC: %d expired, %d evicted, %.1f MB freed", expired, evicted, freed / 1e6)
+        return {"expired": expired, "evicted": evicted, "bytes_freed": freed, "bytes_used": total}
+
+    def start(self, interval: float = OUTPUT_GC_INTERVAL) -> None:
+        """Run ``gc()`` every ``interval`` seconds on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.gc()
+                except Exception:
+                    logger.exception("❌ Output GC failed")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="output-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self.stats, "in_use": len(self._in_use), "max_bytes": self.max_bytes}
+
+
+output_store = OutputStore(MANAGED_DIRS, OUTPUT_MAX_BYTES, OUTPUT_TTL)
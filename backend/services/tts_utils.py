@@ -1,25 +1,433 @@
+import collections
+import hashlib
+import json
+import logging
+import multiprocessing
 import os
+import queue
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
 import uuid
-import pyttsx3
+import wave
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
 
-AUDIO_DIR = "out/visual/audio"
+
+from services.disk_cache import DiskCache
+from services.storage import VISUAL_OUT_DIR, output_store
+
+logger = logging.getLogger(__name__)
+
+AUDIO_DIR = os.path.join(VISUAL_OUT_DIR, "audio")
+SEGMENT_CACHE_DIR = os.path.join(AUDIO_DIR, "segments")
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "256")) * 1024 * 1024
+SEGMENT_FILE = "segment.wav"
 os.makedirs(AUDIO_DIR, exist_ok=True)
 
-# Initialize engine ONCE
-engine = pyttsx3.init()
+# Output encodings, via a local ffmpeg. Speech needs little bitrate.
+AUDIO_FORMATS = {
+    "wav": {"ext": "wav", "media_type": "audio/wav", "ffmpeg": None},
+    "mp3": {"ext": "mp3", "media_type": "audio/mpeg", "ffmpeg": ["-f", "mp3", "-codec:a", "libmp3lame", "-b:a", "48k"]},
+    "opus": {"ext": "ogg", "media_type": "audio/ogg", "ffmpeg": ["-f", "ogg", "-codec:a", "libopus", "-b:a", "24k"]},
+}
+PCM_FORMATS = {1: "u8", 2: "s16le", 4: "s32le"}
+STREAM_CHUNK_SIZE = 16 * 1024
+
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+TTS_QUEUE_SIZE = int(os.getenv("TTS_QUEUE_SIZE", "8"))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "120"))
+# Extra timeout per 1000 characters of a segment, so long pages can finish
+TTS_TIMEOUT_PER_KCHAR = float(os.getenv("TTS_TIMEOUT_PER_KCHAR", "30"))
+
+# Everything that changes how a segment sounds; part of every cache key.
+# Slow speech for accessibility: pyttsx3 defaults to ~200 words/min.
+VOICE_SETTINGS = {
+    "rate": 150,
+    "volume": 1.0,
+    "voice": os.getenv("TTS_VOICE") or None,
+}
+
+segment_cache = DiskCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES)
+
+
+def _ffmpeg() -> str:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found. Please ensure it's installed to encode mp3/opus audio.")
+    return ffmpeg
+
+
+class TTSQueueFull(Exception):
+    """Raised when the synthesis queue is at capacity; callers should retry later."""
+
+
+def _worker_main(conn) -> None:
+    """Synthesis worker: owns one pyttsx3 engine and serves jobs from ``conn``."""
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty("rate", VOICE_SETTINGS["rate"])
+    engine.setProperty("volume", VOICE_SETTINGS["volume"])
+    if VOICE_SETTINGS["voice"]:
+        engine.setProperty("voice", VOICE_SETTINGS["voice"])
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        try:
+            for text, output_path in job:
+                engine.save_to_file(text, output_path)
+            engine.runAndWait()
+            conn.send(("ok", None))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.start()
+
+    def start(self) -> None:
+        self.conn, child_conn = self.ctx.Pipe()
+        self.process = self.ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def restart(self) -> None:
+        self.process.terminate()
+        self.process.join(timeout=5)
+        self.conn.close()
+        self.start()
+
+    def run(self, job: list, timeout: float) -> None:
+        if not self.process.is_alive():
+            self.restart()
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            # The engine is stuck; kill it so the next job gets a fresh one
+            self.restart()
+            raise TimeoutError(f"TTS job did not finish within {timeout}s")
+        status, error = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"TTS synthesis failed: {error}")
+
+
+class TTSWorkerPool:
+    """
+    Fixed set of synthesis processes, each with its own pyttsx3 engine.
+
+    Requests are admitted with ``admit()`` before they are dispatched to
+    the "tts" stage: at most ``workers + queue_size`` may be admitted at
+    once, beyond that ``TTSQueueFull`` is raised straight away. Admitted
+    requests wait for an idle worker. A job running past its timeout gets
+    its worker killed and restarted. Workers start on first use.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._admitted = 0
+        self._idle = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._stats_lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._latencies = collections.deque(maxlen=200)
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._started:
+                return
+            # spawn: engines must not inherit driver state through fork
+            ctx = multiprocessing.get_context("spawn")
+            for _ in range(self.workers):
+                self._idle.put(_Worker(ctx))
+            self._started = True
+
+    def warmup(self) -> None:
+        """Start the workers now instead of on the first request."""
+        self._ensure_started()
+
+    def try_admit(self) -> None:
+        """Take a request slot without blocking; raises ``TTSQueueFull`` when none is free."""
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise TTSQueueFull("TTS queue is full")
+        with self._stats_lock:
+            self._admitted += 1
+
+    def release(self) -> None:
+        with self._stats_lock:
+            self._admitted -= 1
+        self._slots.release()
+
+    @contextmanager
+    def admit(self):
+        """``with tts_pool.admit():`` around one request, checked before dispatching to the "tts" stage."""
+        self.try_admit()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def synthesize(self, job: list, timeout: Optional[float] = None) -> None:
+        """Run ``[(text, output_path), ...]`` on one worker, blocking until done."""
+        self._ensure_started()
+        with self._stats_lock:
+            self._waiting += 1
+        worker = self._idle.get()
+        with self._stats_lock:
+            self._waiting -= 1
+            self._running += 1
+        start = time.perf_counter()
+        try:
+            worker.run(job, timeout or self.timeout)
+            with self._stats_lock:
+                self._completed += 1
+        except TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        except Exception:
+            with self._stats_lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self._running -= 1
+                self._latencies.append(time.perf_counter() - start)
+            self._idle.put(worker)
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            return {
+                "workers": self.workers,
+                # Admitted but not yet on a worker, whether waiting in the
+                # "tts" stage's executor or for an idle worker
+                "queue_depth": max(self._admitted - self._running, self._waiting),
+                "admitted": self._admitted,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+                "latency_seconds": {
+                    "samples": len(latencies),
+                    "p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "p95": round(latencies[int(len(latencies) * 0.95) - 1], 3) if len(latencies) >= 20 else None,
+                    "max": round(latencies[-1], 3) if latencies else None,
+                },
+            }
+
+
+tts_pool = TTSWorkerPool(TTS_WORKERS, TTS_QUEUE_SIZE, TTS_TIMEOUT)
+
+
+def normalize_segment_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def segment_key(text: str) -> str:
+    payload = json.dumps({"text": normalize_segment_text(text), "voice": VOICE_SETTINGS}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def segment_timeout(text: str) -> float:
+    return TTS_TIMEOUT + len(text) / 1000 * TTS_TIMEOUT_PER_KCHAR
+
+
+def _synthesize_missing(segments: List[str]) -> None:
+    """
+    Synthesize every segment not already cached, one worker job per
+    segment. Each finished segment is cached right away, so a document
+    that times out part-way resumes from there on retry.
+    """
+    missing = {}
+    for text in segments:
+        key = segment_key(text)
+        if key not in missing and segment_cache.get(key) is None:
+            missing[key] = normalize_segment_text(text)
+    if not missing:
+        return
+
+    logger.info("🔊 Synthesizing %d of %d segments", len(missing), len(segments))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for key, text in missing.items():
+            path = os.path.join(temp_dir, f"{key}.wav")
+            tts_pool.synthesize([(text, path)], timeout=segment_timeout(text))
+            segment_cache.put(key, {"text": text}, {SEGMENT_FILE: path})
+
+
+def _concatenate_wavs(paths: List[str], output_path: str) -> None:
+    with wave.open(output_path, "wb") as out:
+        params = None
+        for path in paths:
+            with wave.open(path, "rb") as segment:
+                if params is None:
+                    params = segment.getparams()
+                    out.setparams(params)
+                elif segment.getparams()[:3] != params[:3]:
+                    raise ValueError(f"Segment {path} has a different audio format")
+                out.writeframes(segment.readframes(segment.getnframes()))
+
+
+def _segment_path(key: str) -> str:
+    if segment_cache.get(key) is None:
+        raise RuntimeError("TTS segment was evicted before assembly")
+    return os.path.join(segment_cache.entry_dir(key), SEGMENT_FILE)
+
+
+def encode_audio(wav_path: str, audio_format: str) -> str:
+    """Encode a WAV track with the local ffmpeg; the encoded file sits next to it and is reused."""
+    if audio_format == "wav":
+        return wav_path
+    spec = AUDIO_FORMATS[audio_format]
+    output_path = os.path.splitext(wav_path)[0] + "." + spec["ext"]
+    if os.path.exists(output_path):
+        # Reuse counts as an access, so output GC keeps popular tracks
+        output_store.touch(output_path)
+        return output_path
+
+    temp_path = f"{output_path}.{uuid.uuid4().hex}.part"
+    subprocess.run(
+        [_ffmpeg(), "-nostdin", "-loglevel", "error", "-y", "-i", wav_path, *spec["ffmpeg"], temp_path],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+def generate_tts_audio_segments(segments: List[str], audio_format: str = "wav") -> str:
+    """
+    Speak ``segments`` (e.g. one per page) as a single track.
+
+    Each segment is cached on disk by the hash of its normalized text and
+    the voice settings, so repeated or lightly edited documents only
+    synthesize the segments that changed. The assembled track is named after
+    its segment keys and reused as-is when the same segments are requested
+    again. Non-WAV formats are encoded from the assembled WAV.
+    """
+    segments = [s for s in segments if normalize_segment_text(s)]
+    if not segments:
+        raise ValueError("Empty text for TTS")
+
+    keys = [segment_key(s) for s in segments]
+    track_id = hashlib.sha256("|".join(keys).encode("utf-8")).hexdigest()
+    output_path = os.path.join(AUDIO_DIR, f"{track_id}.wav")
+    if not os.path.exists(output_path):
+        _synthesize_missing(segments)
+        segment_paths = [_segment_path(key) for key in keys]
+
+        # Write under a temp name so a concurrent request never serves a partial file
+        temp_path = f"{output_path}.{uuid.uuid4().hex}.part"
+        _concatenate_wavs(segment_paths, temp_path)
+        os.replace(temp_path, output_path)
+    else:
+        output_store.touch(output_path)
+
+    return encode_audio(output_path, audio_format)
 
-# Optional: slow speech for accessibility
-engine.setProperty("rate", 150)   # default ~200
-engine.setProperty("volume", 1.0)
 
 def generate_tts_audio(text: str) -> str:
     if not text.strip():
         raise ValueError("Empty text for TTS")
 
-    filename = f"{uuid.uuid4().hex}.wav"
-    output_path = os.path.join(AUDIO_DIR, filename)
+    return generate_tts_audio_segments([text])
 
-    engine.save_to_file(text, output_path)
-    engine.runAndWait()
 
-    return output_path
+def _iter_segment_pcm(segments: List[str]) -> Iterator[tuple]:
+    """Synthesize segments one at a time, yielding ``(wave params, PCM frames)`` for each."""
+    for text in segments:
+        if not normalize_segment_text(text):
+            continue
+        _synthesize_missing([text])
+        with wave.open(_segment_path(segment_key(text)), "rb") as segment:
+            yield segment.getparams(), segment.readframes(segment.getnframes())
+
+
+def _streaming_wav_header(params) -> bytes:
+    """WAV header with open-ended sizes, as used for live streams of unknown length."""
+    block_align = params.nchannels * params.sampwidth
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, params.nchannels, params.framerate,
+                                 params.framerate * block_align, block_align, params.sampwidth * 8)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+def stream_tts_audio(segments: List[str], audio_format: str = "mp3") -> Iterator[bytes]:
+    """
+    Yield encoded audio for ``segments`` while they are being synthesized.
+
+    Segments are synthesized (or read from the cache) one at a time and
+    their PCM is fed into a single ffmpeg encoder, so playback can start
+    as soon as the first segment is ready. WAV is streamed as raw PCM
+    behind an open-ended header.
+    """
+    pcm = _iter_segment_pcm(segments)
+    first = next(pcm, None)
+    if first is None:
+        raise ValueError("Empty text for TTS")
+    params, frames = first
+
+    if audio_format == "wav":
+        yield _streaming_wav_header(params)
+        yield frames
+        for segment_params, frames in pcm:
+            if segment_params[:3] != params[:3]:
+                raise ValueError("Segments have different audio formats")
+            yield frames
+        return
+
+    encoder = subprocess.Popen(
+        [_ffmpeg(), "-nostdin", "-loglevel", "error",
+         "-f", PCM_FORMATS[params.sampwidth], "-ar", str(params.framerate), "-ac", str(params.nchannels),
+         "-i", "pipe:0", *AUDIO_FORMATS[audio_format]["ffmpeg"], "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    feed_error = []
+
+    def feed():
+        try:
+            encoder.stdin.write(frames)
+            for segment_params, segment_frames in pcm:
+                if segment_params[:3] != params[:3]:
+                    raise ValueError("Segments have different audio formats")
+                encoder.stdin.write(segment_frames)
+        except Exception as e:
+            feed_error.append(e)
+        finally:
+            try:
+                encoder.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, name="tts-encode-feed", daemon=True)
+    feeder.start()
+    try:
+        while chunk := encoder.stdout.read1(STREAM_CHUNK_SIZE):
+            yield chunk
+        encoder.wait()
+        feeder.join()
+        if feed_error:
+            raise feed_error[0]
+    finally:
+        if encoder.poll() is None:
+            encoder.kill()
+            encoder.wait()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the app's packages the way main.py does (``services.x``, ``routers.x``)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import files
+from services.storage import OutputStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    out_dir = tmp_path / "out"
+    audio_dir = out_dir / "visual" / "audio"
+    audio_dir.mkdir(parents=True)
+    (audio_dir / "track.wav").write_bytes(os.urandom(64 * 1024))
+
+    monkeypatch.setattr(files, "OUT_DIR", str(out_dir))
+    monkeypatch.setattr(files, "output_store", OutputStore([str(audio_dir)], max_bytes=1 << 30, ttl_seconds=0))
+    app = FastAPI()
+    app.include_router(files.router, prefix="/out")
+    return TestClient(app)
+
+
+def test_etag_is_stable_across_requests(client):
+    first = client.get("/out/visual/audio/track.wav")
+    second = client.get("/out/visual/audio/track.wav")
+    assert first.status_code == second.status_code == 200
+    assert first.headers["etag"] == second.headers["etag"]
+
+
+def test_conditional_get_returns_304(client):
+    etag = client.get("/out/visual/audio/track.wav").headers["etag"]
+    response = client.get("/out/visual/audio/track.wav", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_if_range_with_current_etag_returns_partial_content(client):
+    etag = client.get("/out/visual/audio/track.wav").headers["etag"]
+    response = client.get("/out/visual/audio/track.wav", headers={"Range": "bytes=100-199", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 100-199/65536"
+    assert len(response.content) == 100
+
+
+def test_paths_outside_out_dir_are_not_served(client):
+    assert client.get("/out/../../etc/passwd").status_code == 404